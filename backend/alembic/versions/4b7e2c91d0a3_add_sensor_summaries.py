@@ -0,0 +1,47 @@
+"""Add sensor_summaries running aggregates
+
+Revision ID: 4b7e2c91d0a3
+Revises: ec684a52f597
+Create Date: 2026-10-18 09:12:40.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4b7e2c91d0a3'
+down_revision: Union[str, Sequence[str], None] = 'ec684a52f597'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('sensor_summaries',
+    sa.Column('sensor_id', sa.String(), nullable=False),
+    sa.Column('reading_count', sa.BigInteger(), nullable=False),
+    sa.Column('temperature_sum', sa.Float(), nullable=False),
+    sa.Column('humidity_sum', sa.Float(), nullable=False),
+    sa.Column('first_seen', sa.DateTime(), nullable=True),
+    sa.Column('last_seen', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('sensor_id'),
+    schema='dev'
+    )
+    # Backfill from the readings already stored
+    op.execute("""
+        INSERT INTO dev.sensor_summaries
+            (sensor_id, reading_count, temperature_sum, humidity_sum, first_seen, last_seen)
+        SELECT sensor_id, COUNT(id), COALESCE(SUM(temperature), 0), COALESCE(SUM(humidity), 0),
+               MIN(timestamp), MAX(timestamp)
+        FROM dev.sensor_readings
+        WHERE sensor_id IS NOT NULL
+        GROUP BY sensor_id
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('sensor_summaries', schema='dev')
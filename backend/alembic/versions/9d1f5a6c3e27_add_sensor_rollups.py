@@ -0,0 +1,55 @@
+"""Add sensor_rollups time buckets
+
+Revision ID: 9d1f5a6c3e27
+Revises: 4b7e2c91d0a3
+Create Date: 2026-10-18 10:03:51.402917
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d1f5a6c3e27'
+down_revision: Union[str, Sequence[str], None] = '4b7e2c91d0a3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('sensor_rollups',
+    sa.Column('sensor_id', sa.String(), nullable=False),
+    sa.Column('resolution', sa.String(), nullable=False),
+    sa.Column('bucket', sa.DateTime(), nullable=False),
+    sa.Column('reading_count', sa.BigInteger(), nullable=False),
+    sa.Column('temperature_sum', sa.Float(), nullable=False),
+    sa.Column('temperature_min', sa.Float(), nullable=True),
+    sa.Column('temperature_max', sa.Float(), nullable=True),
+    sa.Column('humidity_sum', sa.Float(), nullable=False),
+    sa.Column('humidity_min', sa.Float(), nullable=True),
+    sa.Column('humidity_max', sa.Float(), nullable=True),
+    sa.PrimaryKeyConstraint('sensor_id', 'resolution', 'bucket'),
+    schema='dev'
+    )
+    # Backfill every resolution from the readings already stored
+    for resolution, unit in (('1m', 'minute'), ('1h', 'hour'), ('1d', 'day')):
+        op.execute(f"""
+            INSERT INTO dev.sensor_rollups
+                (sensor_id, resolution, bucket, reading_count,
+                 temperature_sum, temperature_min, temperature_max,
+                 humidity_sum, humidity_min, humidity_max)
+            SELECT sensor_id, '{resolution}', date_trunc('{unit}', timestamp), COUNT(id),
+                   COALESCE(SUM(temperature), 0), MIN(temperature), MAX(temperature),
+                   COALESCE(SUM(humidity), 0), MIN(humidity), MAX(humidity)
+            FROM dev.sensor_readings
+            WHERE sensor_id IS NOT NULL AND timestamp IS NOT NULL
+            GROUP BY sensor_id, date_trunc('{unit}', timestamp)
+        """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('sensor_rollups', schema='dev')
@@ -0,0 +1,43 @@
+"""Add irrigation_rules table
+
+Revision ID: a3c7e9f1d248
+Revises: f1a9c3d5b782
+Create Date: 2026-10-18 13:47:12.530981
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3c7e9f1d248'
+down_revision: Union[str, Sequence[str], None] = 'f1a9c3d5b782'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('irrigation_rules',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('zone_id', sa.Integer(), nullable=True),
+    sa.Column('sensor_id', sa.String(), nullable=False),
+    sa.Column('min_humidity', sa.Float(), nullable=False),
+    sa.Column('max_humidity', sa.Float(), nullable=False),
+    sa.Column('enabled', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['zone_id'], ['dev.irrigation_zones.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    schema='dev'
+    )
+    op.create_index(op.f('ix_dev_irrigation_rules_id'), 'irrigation_rules', ['id'], unique=False, schema='dev')
+    op.create_index(op.f('ix_dev_irrigation_rules_zone_id'), 'irrigation_rules', ['zone_id'], unique=False, schema='dev')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_dev_irrigation_rules_zone_id'), table_name='irrigation_rules', schema='dev')
+    op.drop_index(op.f('ix_dev_irrigation_rules_id'), table_name='irrigation_rules', schema='dev')
+    op.drop_table('irrigation_rules', schema='dev')
@@ -0,0 +1,34 @@
+"""Add sensor_readings (timestamp DESC, id DESC) index
+
+Revision ID: a6e1c9d4f052
+Revises: d9f2b6c3e187
+Create Date: 2026-10-18 18:05:12.417839
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a6e1c9d4f052'
+down_revision: Union[str, Sequence[str], None] = 'd9f2b6c3e187'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Latest readings of all sensors (get_recent_readings, unfiltered keyset pages): neither the
+    # (sensor_id, timestamp) btree nor the BRIN index gives that order. Created on the partitioned
+    # parent, it propagates to every partition, existing and future, and the planner merges them.
+    op.create_index(
+        'ix_dev_sensor_readings_timestamp_id', 'sensor_readings', [sa.text('timestamp DESC'), sa.text('id DESC')],
+        unique=False, schema='dev'
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_dev_sensor_readings_timestamp_id', table_name='sensor_readings', schema='dev')
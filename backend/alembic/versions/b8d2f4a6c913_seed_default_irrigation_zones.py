@@ -0,0 +1,36 @@
+"""Seed default irrigation zones
+
+Revision ID: b8d2f4a6c913
+Revises: a3c7e9f1d248
+Create Date: 2026-10-18 14:21:55.047316
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8d2f4a6c913'
+down_revision: Union[str, Sequence[str], None] = 'a3c7e9f1d248'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Previously done by the first GET /irrigation/zones; only on an empty table
+    op.execute("""
+        INSERT INTO dev.irrigation_zones (name, is_pump_active, mode, timer_seconds_remaining)
+        SELECT name, false, 'manual', 0
+        FROM unnest(ARRAY['Sector Norte', 'Sector Sur', 'Invernadero', 'Jardín Principal']) WITH ORDINALITY AS d(name, position)
+        WHERE NOT EXISTS (SELECT 1 FROM dev.irrigation_zones)
+        ORDER BY position
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Zones may have been renamed and have rules/history attached by now: leave them in place
+    pass
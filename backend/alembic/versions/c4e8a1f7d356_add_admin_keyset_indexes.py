@@ -0,0 +1,44 @@
+"""Add keyset pagination indexes for admin users and messages
+
+Revision ID: c4e8a1f7d356
+Revises: b8d2f4a6c913
+Create Date: 2026-10-18 16:41:07.532918
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4e8a1f7d356'
+down_revision: Union[str, Sequence[str], None] = 'b8d2f4a6c913'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Rows without created_at would never satisfy the (created_at, id) < cursor comparison
+    op.execute("UPDATE dev.users SET created_at = now() AT TIME ZONE 'utc' WHERE created_at IS NULL")
+    op.execute("UPDATE dev.user_messages SET created_at = now() AT TIME ZONE 'utc' WHERE created_at IS NULL")
+    op.create_index(
+        'ix_dev_users_created_at_id', 'users', [sa.text('created_at DESC'), sa.text('id DESC')],
+        unique=False, schema='dev'
+    )
+    op.create_index(
+        'ix_dev_user_messages_created_at_id', 'user_messages', [sa.text('created_at DESC'), sa.text('id DESC')],
+        unique=False, schema='dev'
+    )
+    op.create_index(
+        'ix_dev_user_messages_unread_created_at_id', 'user_messages', [sa.text('created_at DESC'), sa.text('id DESC')],
+        unique=False, schema='dev', postgresql_where=sa.text('NOT is_read')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_dev_user_messages_unread_created_at_id', table_name='user_messages', schema='dev')
+    op.drop_index('ix_dev_user_messages_created_at_id', table_name='user_messages', schema='dev')
+    op.drop_index('ix_dev_users_created_at_id', table_name='users', schema='dev')
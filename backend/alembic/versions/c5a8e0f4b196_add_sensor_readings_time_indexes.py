@@ -0,0 +1,33 @@
+"""Add sensor_readings (sensor_id, timestamp) and BRIN indexes
+
+Revision ID: c5a8e0f4b196
+Revises: 9d1f5a6c3e27
+Create Date: 2026-10-18 10:41:07.664381
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5a8e0f4b196'
+down_revision: Union[str, Sequence[str], None] = '9d1f5a6c3e27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_dev_sensor_readings_sensor_id_timestamp', 'sensor_readings', ['sensor_id', sa.text('timestamp DESC')], unique=False, schema='dev')
+    op.create_index('ix_dev_sensor_readings_timestamp_brin', 'sensor_readings', ['timestamp'], unique=False, schema='dev', postgresql_using='brin')
+    # The composite index covers every sensor_id lookup, one index less to maintain on insert
+    op.drop_index(op.f('ix_dev_sensor_readings_sensor_id'), table_name='sensor_readings', schema='dev')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index(op.f('ix_dev_sensor_readings_sensor_id'), 'sensor_readings', ['sensor_id'], unique=False, schema='dev')
+    op.drop_index('ix_dev_sensor_readings_timestamp_brin', table_name='sensor_readings', schema='dev')
+    op.drop_index('ix_dev_sensor_readings_sensor_id_timestamp', table_name='sensor_readings', schema='dev')
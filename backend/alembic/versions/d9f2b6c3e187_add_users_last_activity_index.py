@@ -0,0 +1,31 @@
+"""Add users last activity index
+
+Revision ID: d9f2b6c3e187
+Revises: c4e8a1f7d356
+Create Date: 2026-10-18 17:12:53.904271
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd9f2b6c3e187'
+down_revision: Union[str, Sequence[str], None] = 'c4e8a1f7d356'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        'ix_dev_users_last_activity', 'users', [sa.text('coalesce(last_login, created_at)')],
+        unique=False, schema='dev'
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_dev_users_last_activity', table_name='users', schema='dev')
@@ -0,0 +1,34 @@
+"""Drop users last activity index
+
+Revision ID: e2b7d4f9a160
+Revises: a6e1c9d4f052
+Create Date: 2026-10-18 19:02:41.226503
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2b7d4f9a160'
+down_revision: Union[str, Sequence[str], None] = 'a6e1c9d4f052'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # crud.get_admin_stats counts all three windows in one pass with FILTER aggregates over a
+    # full scan of dev.users; an expression index cannot serve that query, it only costs writes
+    # (every login updates last_login).
+    op.drop_index('ix_dev_users_last_activity', table_name='users', schema='dev')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index(
+        'ix_dev_users_last_activity', 'users', [sa.text('coalesce(last_login, created_at)')],
+        unique=False, schema='dev'
+    )
@@ -0,0 +1,106 @@
+"""Partition sensor_readings by month
+
+Revision ID: e7f3b2d84a10
+Revises: c5a8e0f4b196
+Create Date: 2026-10-18 11:26:33.905172
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7f3b2d84a10'
+down_revision: Union[str, Sequence[str], None] = 'c5a8e0f4b196'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 1. Keep the old heap table aside, detach its id sequence so the new table can reuse it
+    op.execute("ALTER TABLE dev.sensor_readings RENAME TO sensor_readings_heap")
+    op.execute("ALTER TABLE dev.sensor_readings_heap RENAME CONSTRAINT sensor_readings_pkey TO sensor_readings_heap_pkey")
+    op.execute("ALTER SEQUENCE dev.sensor_readings_id_seq OWNED BY NONE")
+    op.drop_index('ix_dev_sensor_readings_timestamp_brin', table_name='sensor_readings_heap', schema='dev')
+    op.drop_index('ix_dev_sensor_readings_sensor_id_timestamp', table_name='sensor_readings_heap', schema='dev')
+    op.drop_index(op.f('ix_dev_sensor_readings_id'), table_name='sensor_readings_heap', schema='dev')
+
+    # 2. Partitioned parent. The partition key has to be part of the primary key.
+    op.execute("""
+        CREATE TABLE dev.sensor_readings (
+            id INTEGER NOT NULL DEFAULT nextval('dev.sensor_readings_id_seq'),
+            sensor_id VARCHAR,
+            temperature DOUBLE PRECISION,
+            humidity DOUBLE PRECISION,
+            timestamp TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            PRIMARY KEY (id, timestamp)
+        ) PARTITION BY RANGE (timestamp)
+    """)
+    op.execute("ALTER SEQUENCE dev.sensor_readings_id_seq OWNED BY dev.sensor_readings.id")
+    op.execute("CREATE TABLE dev.sensor_readings_default PARTITION OF dev.sensor_readings DEFAULT")
+
+    # 3. One partition per month from the oldest reading up to two months ahead
+    op.execute("""
+        DO $$
+        DECLARE
+            month_start DATE := date_trunc('month', COALESCE(
+                (SELECT MIN(timestamp) FROM dev.sensor_readings_heap), now()))::date;
+            last_month DATE := (date_trunc('month', now()) + interval '2 months')::date;
+        BEGIN
+            WHILE month_start <= last_month LOOP
+                EXECUTE format(
+                    'CREATE TABLE IF NOT EXISTS dev.%I PARTITION OF dev.sensor_readings FOR VALUES FROM (%L) TO (%L)',
+                    'sensor_readings_p' || to_char(month_start, 'YYYYMM'),
+                    month_start, (month_start + interval '1 month')::date
+                );
+                month_start := (month_start + interval '1 month')::date;
+            END LOOP;
+        END $$;
+    """)
+
+    # 4. Move the data (rows without timestamp land in the default partition)
+    op.execute("""
+        INSERT INTO dev.sensor_readings (id, sensor_id, temperature, humidity, timestamp)
+        SELECT id, sensor_id, temperature, humidity, COALESCE(timestamp, '1970-01-01')
+        FROM dev.sensor_readings_heap
+    """)
+    op.drop_table('sensor_readings_heap', schema='dev')
+
+    # 5. Indexes on the parent propagate to every partition
+    op.create_index(op.f('ix_dev_sensor_readings_id'), 'sensor_readings', ['id'], unique=False, schema='dev')
+    op.create_index('ix_dev_sensor_readings_sensor_id_timestamp', 'sensor_readings', ['sensor_id', sa.text('timestamp DESC')], unique=False, schema='dev')
+    op.create_index('ix_dev_sensor_readings_timestamp_brin', 'sensor_readings', ['timestamp'], unique=False, schema='dev', postgresql_using='brin')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("ALTER SEQUENCE dev.sensor_readings_id_seq OWNED BY NONE")
+    op.drop_index('ix_dev_sensor_readings_timestamp_brin', table_name='sensor_readings', schema='dev')
+    op.drop_index('ix_dev_sensor_readings_sensor_id_timestamp', table_name='sensor_readings', schema='dev')
+    op.drop_index(op.f('ix_dev_sensor_readings_id'), table_name='sensor_readings', schema='dev')
+    op.execute("ALTER TABLE dev.sensor_readings RENAME TO sensor_readings_partitioned")
+    op.execute("ALTER TABLE dev.sensor_readings_partitioned RENAME CONSTRAINT sensor_readings_pkey TO sensor_readings_partitioned_pkey")
+    op.execute("""
+        CREATE TABLE dev.sensor_readings (
+            id INTEGER NOT NULL DEFAULT nextval('dev.sensor_readings_id_seq'),
+            sensor_id VARCHAR,
+            temperature DOUBLE PRECISION,
+            humidity DOUBLE PRECISION,
+            timestamp TIMESTAMP WITHOUT TIME ZONE,
+            PRIMARY KEY (id)
+        )
+    """)
+    op.execute("ALTER SEQUENCE dev.sensor_readings_id_seq OWNED BY dev.sensor_readings.id")
+    op.execute("""
+        INSERT INTO dev.sensor_readings (id, sensor_id, temperature, humidity, timestamp)
+        SELECT id, sensor_id, temperature, humidity, timestamp
+        FROM dev.sensor_readings_partitioned
+    """)
+    # Dropping the parent drops every partition with it
+    op.execute("DROP TABLE dev.sensor_readings_partitioned")
+    op.create_index(op.f('ix_dev_sensor_readings_id'), 'sensor_readings', ['id'], unique=False, schema='dev')
+    op.create_index('ix_dev_sensor_readings_sensor_id_timestamp', 'sensor_readings', ['sensor_id', sa.text('timestamp DESC')], unique=False, schema='dev')
+    op.create_index('ix_dev_sensor_readings_timestamp_brin', 'sensor_readings', ['timestamp'], unique=False, schema='dev', postgresql_using='brin')
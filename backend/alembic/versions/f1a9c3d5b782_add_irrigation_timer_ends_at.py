@@ -0,0 +1,39 @@
+"""Add irrigation_zones.timer_ends_at
+
+Revision ID: f1a9c3d5b782
+Revises: e7f3b2d84a10
+Create Date: 2026-10-18 13:02:41.218604
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1a9c3d5b782'
+down_revision: Union[str, Sequence[str], None] = 'e7f3b2d84a10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('irrigation_zones', sa.Column('timer_ends_at', sa.DateTime(), nullable=True), schema='dev')
+    op.create_index(
+        'ix_dev_irrigation_zones_timer_ends_at', 'irrigation_zones', ['timer_ends_at'], unique=False, schema='dev',
+        postgresql_where=sa.text('timer_ends_at IS NOT NULL')
+    )
+    # Timers that were running before the scheduler existed restart from their stored duration
+    op.execute("""
+        UPDATE dev.irrigation_zones
+        SET timer_ends_at = (now() AT TIME ZONE 'utc') + make_interval(secs => timer_seconds_remaining)
+        WHERE mode = 'timer' AND is_pump_active AND timer_seconds_remaining > 0
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_dev_irrigation_zones_timer_ends_at', table_name='irrigation_zones', schema='dev')
+    op.drop_column('irrigation_zones', 'timer_ends_at', schema='dev')
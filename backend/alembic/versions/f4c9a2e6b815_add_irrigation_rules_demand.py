@@ -0,0 +1,36 @@
+"""Add irrigation_rules demand
+
+Revision ID: f4c9a2e6b815
+Revises: e2b7d4f9a160
+Create Date: 2026-10-18 19:41:07.583912
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f4c9a2e6b815'
+down_revision: Union[str, Sequence[str], None] = 'e2b7d4f9a160'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Rules start from the pump state of their zone, as the in-memory engine did
+    op.add_column(
+        'irrigation_rules', sa.Column('demand', sa.Boolean(), server_default=sa.text('false'), nullable=False),
+        schema='dev'
+    )
+    op.execute(
+        "UPDATE dev.irrigation_rules AS r SET demand = z.is_pump_active "
+        "FROM dev.irrigation_zones AS z WHERE z.id = r.zone_id AND z.is_pump_active"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('irrigation_rules', 'demand', schema='dev')
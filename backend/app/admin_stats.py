@@ -0,0 +1,84 @@
+"""
+Statistics behind GET /admin/stats.
+
+The user counts come from one aggregate query (crud.get_admin_stats) and are
+kept for ADMIN_STATS_TTL_SECONDS, so dashboards refreshing in several tabs do
+not rescan dev.users on every load; counts may lag writes by up to the TTL.
+system_uptime is the uptime of this backend process.
+"""
+import hashlib
+import os
+import threading
+import time
+from typing import Optional, Tuple
+
+from . import crud
+from .database import SessionLocal
+
+ADMIN_STATS_TTL_SECONDS = float(os.getenv("ADMIN_STATS_TTL_SECONDS", "30"))
+
+_STARTED = time.monotonic() # Set on import, i.e. when the process starts serving
+
+
+def uptime_seconds() -> float:
+    return time.monotonic() - _STARTED
+
+
+def format_uptime(seconds: float) -> str:
+    minutes = int(seconds // 60)
+    days, minutes = divmod(minutes, 24 * 60)
+    hours, minutes = divmod(minutes, 60)
+    if days:
+        return f"{days}d {hours}h {minutes}m"
+    if hours:
+        return f"{hours}h {minutes}m"
+    return f"{minutes}m"
+
+
+class AdminStatsSnapshot:
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        # (counts, generation), replaced as a whole; generation is a hash of the counts (/admin/stats ETag)
+        self._entry: Tuple[Optional[dict], Optional[str]] = (None, None)
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+        # Metrics
+        self.hits = 0
+        self.reloads = 0
+
+    def _fresh(self) -> bool:
+        return self._entry[0] is not None and time.monotonic() - self._loaded_at < self.ttl
+
+    def get(self) -> Tuple[dict, str]:
+        """Returns (counts, generation), reloading when older than the TTL."""
+        if self._fresh():
+            self.hits += 1
+            return self._entry
+        with self._lock:
+            if self._fresh():
+                self.hits += 1
+                return self._entry
+            db = SessionLocal()
+            try:
+                counts = crud.get_admin_stats(db)
+            finally:
+                db.close()
+            # Same counts, same generation: a reload alone does not change the ETag
+            generation = hashlib.blake2b(repr(sorted(counts.items())).encode(), digest_size=8).hexdigest()
+            self._entry, self._loaded_at = (counts, generation), time.monotonic()
+            self.reloads += 1
+            return counts, generation
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.reloads
+        return {
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "reloads": self.reloads,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "uptime_seconds": uptime_seconds(),
+        }
+
+
+snapshot = AdminStatsSnapshot(ADMIN_STATS_TTL_SECONDS)
@@ -0,0 +1,182 @@
+"""
+Cold storage of old sensor readings as Parquet files.
+
+Layout: {ARCHIVE_DIR}/sensor_id={sensor, percent-encoded}/date={YYYY-MM-DD}/readings.parquet
+(one file per sensor and day, zstd compressed). Rows are streamed from Postgres
+with a server-side cursor and written in row groups of ARCHIVE_CHUNK_SIZE, so
+memory stays bounded by one chunk no matter how many rows are exported.
+Re-exporting a day replaces its file, so the export is safe to repeat.
+
+pyarrow is only imported when the archive is actually used.
+"""
+import os
+import time
+from datetime import date, datetime, timedelta
+from typing import Iterator, List, Optional
+from urllib.parse import quote
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from . import models
+
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "archive")
+ARCHIVE_CHUNK_SIZE = int(os.getenv("ARCHIVE_CHUNK_SIZE", "50000"))
+# Export partitions to the archive before the retention job drops them
+ARCHIVE_BEFORE_RETENTION = os.getenv("ARCHIVE_BEFORE_RETENTION", "false").lower() in ("1", "true", "yes")
+
+last_export: dict = {}
+
+
+class ArchiveUnavailable(Exception):
+    """pyarrow is not installed."""
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ArchiveUnavailable("pyarrow is required for the Parquet archive (pip install pyarrow)") from e
+    return pyarrow
+
+
+def ensure_available():
+    """Raises ArchiveUnavailable if pyarrow is missing (check before scheduling an export)."""
+    _pyarrow()
+
+
+def _dirname(sensor_id: str) -> str:
+    # Percent-encoding is reversible, so two sensor ids never share a directory
+    # (plain ids such as ESP32-001 are left as they are)
+    encoded = quote(sensor_id, safe="")
+    if encoded in (".", ".."):
+        encoded = encoded.replace(".", "%2E")
+    return encoded
+
+
+def day_path(sensor_id: str, day: date) -> str:
+    return os.path.join(ARCHIVE_DIR, f"sensor_id={_dirname(sensor_id)}", f"date={day.isoformat()}", "readings.parquet")
+
+
+class _DayWriter:
+    """Writes one (sensor, day) file chunk by chunk; the file appears atomically on close."""
+
+    def __init__(self, pa, schema, sensor_id: str, day: date):
+        self.pa = pa
+        self.path = day_path(sensor_id, day)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.tmp_path = self.path + ".tmp"
+        self.writer = pa.parquet.ParquetWriter(self.tmp_path, schema, compression="zstd")
+        self.schema = schema
+        self.rows = 0
+
+    def write(self, rows: List):
+        columns = list(zip(*rows))
+        table = self.pa.Table.from_arrays([self.pa.array(col) for col in columns], schema=self.schema)
+        self.writer.write_table(table)
+        self.rows += len(rows)
+
+    def close(self):
+        self.writer.close()
+        os.replace(self.tmp_path, self.path)
+
+
+def day_bounds(before: datetime, since: Optional[datetime] = None):
+    """
+    Rounds an export range to whole days: files hold a full (sensor, day) and are
+    replaced on re-export, so a partial day would drop its other archived rows.
+    `before` goes down to midnight (the partial last day is left out), `since`
+    down to midnight (its whole first day is exported).
+    """
+    def midnight(ts: datetime) -> datetime:
+        return datetime.combine(ts.date(), datetime.min.time())
+    return midnight(before), midnight(since) if since is not None else None
+
+
+def export_readings(db: Session, before: datetime, since: Optional[datetime] = None, chunk_size: int = ARCHIVE_CHUNK_SIZE):
+    """
+    Streams readings with timestamp in [since, before), rounded to whole days
+    (see day_bounds), into the archive.
+    Returns a summary dict (rows, files, seconds), also kept in `last_export`.
+    """
+    before, since = day_bounds(before, since)
+    pa = _pyarrow()
+    schema = pa.schema([
+        ("id", pa.int64()),
+        ("sensor_id", pa.string()),
+        ("temperature", pa.float64()),
+        ("humidity", pa.float64()),
+        ("timestamp", pa.timestamp("us")),
+    ])
+    readings = models.SensorReading
+    query = select(
+        readings.id, readings.sensor_id, readings.temperature, readings.humidity, readings.timestamp
+    ).where(readings.timestamp < before, readings.sensor_id.isnot(None))
+    if since is not None:
+        query = query.where(readings.timestamp >= since)
+    query = query.order_by(readings.sensor_id, readings.timestamp).execution_options(yield_per=chunk_size)
+
+    started = time.perf_counter()
+    total_rows = 0
+    files = 0
+    writer: Optional[_DayWriter] = None
+    current_key = None
+    pending: List = []
+    try:
+        for chunk in db.execute(query).partitions():
+            for row in chunk:
+                key = (row.sensor_id, row.timestamp.date())
+                if key != current_key:
+                    if writer is not None:
+                        if pending:
+                            writer.write(pending)
+                        writer.close()
+                        files += 1
+                    writer = _DayWriter(pa, schema, key[0], key[1])
+                    current_key = key
+                    pending = []
+                pending.append(tuple(row))
+                if len(pending) >= chunk_size:
+                    writer.write(pending)
+                    pending = []
+                total_rows += 1
+        if writer is not None:
+            if pending:
+                writer.write(pending)
+            writer.close()
+            files += 1
+    finally:
+        db.rollback() # Release the server-side cursor
+
+    result = {
+        "before": before.isoformat(),
+        "since": since.isoformat() if since else None,
+        "rows": total_rows,
+        "files": files,
+        "seconds": round(time.perf_counter() - started, 3),
+        "finished_at": datetime.utcnow().isoformat(),
+    }
+    last_export.clear()
+    last_export.update(result)
+    return result
+
+
+def has_archive(sensor_id: str) -> bool:
+    return os.path.isdir(os.path.join(ARCHIVE_DIR, f"sensor_id={_dirname(sensor_id)}"))
+
+
+def read_archived(sensor_id: str, start: datetime, end: datetime) -> Iterator[dict]:
+    """Archived readings of one sensor in [start, end), oldest first, one day file at a time."""
+    if not has_archive(sensor_id):
+        return
+    pa = _pyarrow()
+    day = start.date()
+    while day <= end.date():
+        path = day_path(sensor_id, day)
+        if os.path.exists(path):
+            table = pa.parquet.read_table(path, columns=["id", "sensor_id", "temperature", "humidity", "timestamp"])
+            for row in table.to_pylist():
+                if start <= row["timestamp"] < end:
+                    yield row
+        day += timedelta(days=1)
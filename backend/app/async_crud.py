@@ -0,0 +1,81 @@
+"""
+AsyncSession versions of the crud.py functions used on the hot paths
+(authentication, profile, sensor ingestion and dashboard stats).
+
+They build the same statements as crud.py (shared builders where the SQL is
+non-trivial) and keep the same side effects: summary and rollup upserts in the
+ingest transaction, and the post-commit hooks of user and reading writes
+(auth cache, ETag versions, live hub, rules engine).
+"""
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import crud, models, schemas
+
+# --- User CRUD ---
+async def get_user_by_email(db: AsyncSession, email: str):
+    return await db.scalar(select(models.User).where(models.User.email == email))
+
+async def get_user(db: AsyncSession, user_id: int):
+    return await db.get(models.User, user_id)
+
+async def create_user(db: AsyncSession, user: schemas.UserCreate, hashed_password: str):
+    db_user = await db.scalar(crud.user_insert_stmt(user, hashed_password))
+    await db.commit()
+    crud.users_changed()
+    return db_user
+
+async def update_user(db: AsyncSession, user_id: int, user_update: schemas.UserUpdate, hashed_password: Optional[str] = None):
+    db_user = await db.scalar(crud.user_update_stmt(user_id, crud.user_update_values(user_update, hashed_password)))
+    await db.commit()
+    if db_user:
+        crud.users_changed(user_id, db_user.email)
+    return db_user
+
+async def update_last_login(db: AsyncSession, user_id: int):
+    email = await db.scalar(crud.last_login_stmt(user_id))
+    await db.commit()
+    crud.users_changed(user_id, email)
+
+async def set_profile_image(db: AsyncSession, user_id: int, image_url: Optional[str]):
+    email = await db.scalar(crud.profile_image_stmt(user_id, image_url))
+    await db.commit()
+    crud.users_changed(user_id, email)
+    return email
+
+# --- Sensor CRUD ---
+async def create_sensor_reading(db: AsyncSession, reading: schemas.SensorReadingCreate):
+    row = crud.sensor_reading_row(reading, datetime.utcnow())
+    db_reading = await db.scalar(crud.sensor_reading_insert_stmt(row))
+    for stmt in crud.ingest_aggregate_statements([row]):
+        await db.execute(stmt)
+    await db.commit()
+    crud.readings_committed([{
+        "id": db_reading.id,
+        "sensor_id": db_reading.sensor_id,
+        "temperature": db_reading.temperature,
+        "humidity": db_reading.humidity,
+        "timestamp": db_reading.timestamp,
+    }])
+    return db_reading
+
+async def create_sensor_readings_bulk(db: AsyncSession, readings: List[schemas.SensorReadingCreate], timestamps: Optional[List[datetime]] = None):
+    """Async counterpart of crud.create_sensor_readings_bulk (single multi-row INSERT, one transaction)."""
+    if not readings:
+        return 0
+    if timestamps is None:
+        timestamps = [datetime.utcnow()] * len(readings)
+    rows = [crud.sensor_reading_row(reading, ts) for reading, ts in zip(readings, timestamps)]
+    result = await db.execute(crud.sensor_readings_bulk_insert_stmt(), rows)
+    stored = [dict(row._mapping) for row in result]
+    for stmt in crud.ingest_aggregate_statements(rows):
+        await db.execute(stmt)
+    await db.commit()
+    crud.readings_committed(stored)
+    return len(rows)
+
+async def get_dashboard_stats(db: AsyncSession):
+    return crud.dashboard_stats_from_row((await db.execute(crud.DASHBOARD_STATS_QUERY)).one())
@@ -0,0 +1,144 @@
+"""
+TTL + LRU cache of authenticated principals, keyed by the JWT subject (email).
+
+get_current_user looks the subject up here before going to Postgres. Entries are
+plain schemas.User snapshots (no password hash, not bound to a Session). crud
+invalidates them explicitly whenever a user's role, email, is_active or profile
+changes, so a deactivation takes effect on the next request of this process.
+A lookup that started before an invalidation cannot put its (stale) principal
+back: `begin()` returns a sequence number and `put` drops the entry if the
+subject or user id was invalidated after it.
+
+Other uvicorn workers do not see the invalidation: there a role change or a
+deactivation takes effect after at most AUTH_CACHE_TTL_SECONDS (5 s by
+default). Set it to 0 to disable the cache when that bound is not acceptable.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from . import schemas
+
+AUTH_CACHE_TTL_SECONDS = float(os.getenv("AUTH_CACHE_TTL_SECONDS", "5"))
+AUTH_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "1024"))
+
+
+class PrincipalCache:
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._subjects_by_id = {} # user id -> subject, for writes that only know the id
+        self._lock = threading.Lock() # Sync endpoints run in the threadpool
+        # Invalidation sequence: last invalidation per subject / user id. When these maps get
+        # too large they are cleared and _floor rejects every lookup that began before that.
+        self._seq = 0
+        self._floor = 0
+        self._invalidated_subjects = {}
+        self._invalidated_ids = {}
+
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_entries > 0
+
+    def get(self, subject: str) -> Optional[schemas.User]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(subject)
+            if entry is None or entry[1] < time.monotonic():
+                if entry is not None:
+                    del self._entries[subject]
+                    self._forget_id(entry[0].id, subject)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(subject)
+            self.hits += 1
+            return entry[0]
+
+    def begin(self) -> int:
+        """Call before reading the user from the database; pass the result to `put`."""
+        return self._seq
+
+    def put(self, subject: str, principal: schemas.User, since: int):
+        if not self.enabled:
+            return
+        with self._lock:
+            if (
+                since < self._floor
+                or self._invalidated_subjects.get(subject, -1) > since
+                or self._invalidated_ids.get(principal.id, -1) > since
+            ):
+                return # Invalidated while it was being read
+            self._entries[subject] = (principal, time.monotonic() + self.ttl)
+            self._entries.move_to_end(subject)
+            self._subjects_by_id[principal.id] = subject
+            while len(self._entries) > self.max_entries:
+                evicted_subject, (evicted, _) = self._entries.popitem(last=False)
+                self._forget_id(evicted.id, evicted_subject)
+                self.evictions += 1
+
+    def invalidate(self, *subjects: Optional[str]):
+        with self._lock:
+            seq = self._next_seq()
+            for subject in subjects:
+                self._pop(subject, seq)
+
+    def invalidate_user(self, user_id: int, *subjects: Optional[str]):
+        """Drops the entry cached for this user id (whatever its email was) plus any given subjects."""
+        with self._lock:
+            seq = self._next_seq()
+            self._invalidated_ids[user_id] = seq
+            self._pop(self._subjects_by_id.get(user_id), seq)
+            for subject in subjects:
+                self._pop(subject, seq)
+
+    def _next_seq(self) -> int:
+        if len(self._invalidated_subjects) + len(self._invalidated_ids) > 4 * self.max_entries:
+            self._invalidated_subjects.clear()
+            self._invalidated_ids.clear()
+            self._floor = self._seq + 1
+        self._seq += 1
+        return self._seq
+
+    def _pop(self, subject: Optional[str], seq: int):
+        if subject is None:
+            return
+        self._invalidated_subjects[subject] = seq
+        entry = self._entries.pop(subject, None)
+        if entry is not None:
+            self._forget_id(entry[0].id, subject)
+            self.invalidations += 1
+
+    def _forget_id(self, user_id: int, subject: str):
+        if self._subjects_by_id.get(user_id) == subject:
+            del self._subjects_by_id[user_id]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._subjects_by_id.clear()
+            self._floor = self._next_seq()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+principals = PrincipalCache(AUTH_CACHE_TTL_SECONDS, AUTH_CACHE_MAX_ENTRIES)
@@ -1,6 +1,8 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from . import models, schemas
+from sqlalchemy import case, func, insert, select, update, delete, text, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from typing import List, Optional, Tuple
+from . import auth_cache, etags, live, metrics, models, mqtt, rules, scheduler, schemas
 from passlib.context import CryptContext
 from datetime import datetime, timedelta
 
@@ -21,153 +23,653 @@ def verify_password(plain_password, hashed_password):
 def get_user_by_email(db: Session, email: str):
     return db.query(models.User).filter(models.User.email == email).first()
 
-def get_users(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.User).offset(skip).limit(limit).all()
+def get_users_page(
+    db: Session,
+    role: Optional[str] = None,
+    is_active: Optional[bool] = None,
+    after: Optional[Tuple[datetime, int]] = None,
+    limit: int = 100,
+    project: bool = False
+):
+    """
+    Newest-first page of users, keyset pagination on (created_at, id).
+    `after` is the (created_at, id) of the last row of the previous page.
+    With `project`, rows are column tuples in schemas.User field order (app/fast_json.py).
+    Returns (rows, has_more).
+    """
+    query = db.query(*schema_columns(models.User, schemas.User)) if project else db.query(models.User)
+    if role is not None:
+        query = query.filter(models.User.role == role)
+    if is_active is not None:
+        query = query.filter(models.User.is_active == is_active)
+    if after is not None:
+        query = query.filter(tuple_(models.User.created_at, models.User.id) < tuple_(*after))
+    rows = query.order_by(models.User.created_at.desc(), models.User.id.desc()).limit(limit + 1).all()
+    return rows[:limit], len(rows) > limit
+
+def schema_columns(model, schema):
+    """Columns of `model` in the field order of the response `schema`, for projected reads."""
+    return [getattr(model, name) for name in schema.model_fields]
 
 def get_user(db: Session, user_id: int):
     return db.query(models.User).filter(models.User.id == user_id).first()
 
-def create_user(db: Session, user: schemas.UserCreate):
-    hashed_password = get_password_hash(user.password)
-    db_user = models.User(email=user.email, full_name=user.full_name, hashed_password=hashed_password)
-    db.add(db_user)
+def users_changed(user_id: Optional[int] = None, *subjects: Optional[str]):
+    """Post-commit hook of user writes: cached principals and the users ETag version (shared with async_crud)."""
+    if user_id is not None:
+        auth_cache.principals.invalidate_user(user_id, *subjects)
+    etags.versions.bump("users")
+
+def create_user(db: Session, user: schemas.UserCreate, hashed_password: Optional[str] = None):
+    # Callers on the event loop pass a hash computed by app.hashing
+    if hashed_password is None:
+        hashed_password = get_password_hash(user.password)
+    db_user = db.scalar(user_insert_stmt(user, hashed_password))
     db.commit()
-    db.refresh(db_user)
+    users_changed()
     return db_user
 
-def update_user(db: Session, db_user: models.User, user_update: schemas.UserUpdate):
+def user_insert_stmt(user: schemas.UserCreate, hashed_password: str):
+    # INSERT ... RETURNING: defaults and id come back with the insert, no refresh SELECT
+    return insert(models.User).values(
+        email=user.email, full_name=user.full_name, hashed_password=hashed_password
+    ).returning(models.User)
+
+def user_update_values(user_update, hashed_password: Optional[str] = None) -> dict:
     update_data = user_update.model_dump(exclude_unset=True)
     if "password" in update_data:
-        update_data["hashed_password"] = get_password_hash(update_data["password"])
+        update_data["hashed_password"] = hashed_password or get_password_hash(update_data["password"])
         del update_data["password"]
-    
-    for key, value in update_data.items():
-        setattr(db_user, key, value)
-    
-    db.add(db_user)
+    return update_data
+
+def user_update_stmt(user_id: int, values: dict):
+    stmt = update(models.User).where(models.User.id == user_id)
+    if values:
+        stmt = stmt.values(**values)
+    else:
+        stmt = stmt.values(id=models.User.id) # Nothing to change, still return the row
+    return stmt.returning(models.User).execution_options(populate_existing=True)
+
+def update_user(db: Session, user_id: int, user_update: schemas.UserUpdate, hashed_password: Optional[str] = None):
+    """UPDATE ... RETURNING in one statement; None if the user does not exist."""
+    db_user = db.scalar(user_update_stmt(user_id, user_update_values(user_update, hashed_password)))
     db.commit()
-    db.refresh(db_user)
+    if db_user:
+        users_changed(user_id, db_user.email)
     return db_user
 
-def update_user_admin(db: Session, db_user: models.User, user_update: schemas.UserAdminUpdate):
-    update_data = user_update.model_dump(exclude_unset=True)
-    if "password" in update_data:
-        update_data["hashed_password"] = get_password_hash(update_data["password"])
-        del update_data["password"]
-    
-    for key, value in update_data.items():
-        setattr(db_user, key, value)
-    
-    db.add(db_user)
+def update_user_admin(db: Session, user_id: int, user_update: schemas.UserAdminUpdate, hashed_password: Optional[str] = None):
+    db_user = db.scalar(user_update_stmt(user_id, user_update_values(user_update, hashed_password)))
     db.commit()
-    db.refresh(db_user)
-    db.commit()
-    db.refresh(db_user)
+    if db_user:
+        # Role / is_active / email changes must apply on the user's next request
+        users_changed(user_id, db_user.email)
     return db_user
 
 def delete_user(db: Session, user_id: int):
-    user = db.query(models.User).filter(models.User.id == user_id).first()
-    if user:
-        db.delete(user)
-        db.commit()
-    return user
+    """Returns the deleted user's email, or None if it did not exist."""
+    # Messages are kept without sender, as the ORM delete used to do
+    db.execute(update(models.UserMessage).where(models.UserMessage.user_id == user_id).values(user_id=None))
+    email = db.scalar(delete(models.User).where(models.User.id == user_id).returning(models.User.email))
+    db.commit()
+    if email is not None:
+        users_changed(user_id, email)
+    return email
+
+def profile_image_stmt(user_id: int, image_url: Optional[str]):
+    return update(models.User).where(models.User.id == user_id).values(
+        profile_image_url=image_url
+    ).returning(models.User.email)
+
+def set_profile_image(db: Session, user_id: int, image_url: Optional[str]):
+    email = db.scalar(profile_image_stmt(user_id, image_url))
+    db.commit()
+    users_changed(user_id, email)
+    return email
 
 # --- Sensor CRUD ---
+def sensor_summary_upsert(rows: List[dict]):
+    """
+    Upsert adding a batch of reading rows to the running per-sensor aggregates.
+    Executed inside the caller's transaction, so the summary and the raw rows commit together.
+    """
+    deltas = {}
+    for row in rows:
+        delta = deltas.get(row["sensor_id"])
+        if delta is None:
+            delta = deltas[row["sensor_id"]] = {
+                "sensor_id": row["sensor_id"],
+                "reading_count": 0,
+                "temperature_sum": 0.0,
+                "humidity_sum": 0.0,
+                "first_seen": row["timestamp"],
+                "last_seen": row["timestamp"],
+            }
+        delta["reading_count"] += 1
+        delta["temperature_sum"] += row["temperature"]
+        delta["humidity_sum"] += row["humidity"]
+        delta["first_seen"] = min(delta["first_seen"], row["timestamp"])
+        delta["last_seen"] = max(delta["last_seen"], row["timestamp"])
+
+    table = models.SensorSummary.__table__
+    # Sorted so concurrent batches lock summary rows in the same order (no deadlocks)
+    stmt = pg_insert(table).values([deltas[key] for key in sorted(deltas)])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.sensor_id],
+        set_={
+            "reading_count": table.c.reading_count + stmt.excluded.reading_count,
+            "temperature_sum": table.c.temperature_sum + stmt.excluded.temperature_sum,
+            "humidity_sum": table.c.humidity_sum + stmt.excluded.humidity_sum,
+            "first_seen": func.least(table.c.first_seen, stmt.excluded.first_seen),
+            "last_seen": func.greatest(table.c.last_seen, stmt.excluded.last_seen),
+        },
+    )
+    return stmt
+
+# Rollup resolutions and their bucket width in seconds, finest first
+ROLLUP_RESOLUTIONS = {"1m": 60, "1h": 3600, "1d": 86400}
+
+def rollup_bucket(ts: datetime, resolution: str) -> datetime:
+    if resolution == "1m":
+        return ts.replace(second=0, microsecond=0)
+    if resolution == "1h":
+        return ts.replace(minute=0, second=0, microsecond=0)
+    return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+
+def sensor_rollup_upsert(rows: List[dict]):
+    """
+    Upsert folding a batch of reading rows into the 1m/1h/1d rollup buckets (min, max, sum, count).
+    Executed inside the caller's transaction, like sensor_summary_upsert.
+    """
+    deltas = {}
+    for row in rows:
+        for resolution in ROLLUP_RESOLUTIONS:
+            key = (row["sensor_id"], resolution, rollup_bucket(row["timestamp"], resolution))
+            delta = deltas.get(key)
+            if delta is None:
+                deltas[key] = {
+                    "sensor_id": key[0],
+                    "resolution": key[1],
+                    "bucket": key[2],
+                    "reading_count": 1,
+                    "temperature_sum": row["temperature"],
+                    "temperature_min": row["temperature"],
+                    "temperature_max": row["temperature"],
+                    "humidity_sum": row["humidity"],
+                    "humidity_min": row["humidity"],
+                    "humidity_max": row["humidity"],
+                }
+                continue
+            delta["reading_count"] += 1
+            delta["temperature_sum"] += row["temperature"]
+            delta["temperature_min"] = min(delta["temperature_min"], row["temperature"])
+            delta["temperature_max"] = max(delta["temperature_max"], row["temperature"])
+            delta["humidity_sum"] += row["humidity"]
+            delta["humidity_min"] = min(delta["humidity_min"], row["humidity"])
+            delta["humidity_max"] = max(delta["humidity_max"], row["humidity"])
+
+    table = models.SensorRollup.__table__
+    stmt = pg_insert(table).values([deltas[key] for key in sorted(deltas)])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.sensor_id, table.c.resolution, table.c.bucket],
+        set_={
+            "reading_count": table.c.reading_count + stmt.excluded.reading_count,
+            "temperature_sum": table.c.temperature_sum + stmt.excluded.temperature_sum,
+            "temperature_min": func.least(table.c.temperature_min, stmt.excluded.temperature_min),
+            "temperature_max": func.greatest(table.c.temperature_max, stmt.excluded.temperature_max),
+            "humidity_sum": table.c.humidity_sum + stmt.excluded.humidity_sum,
+            "humidity_min": func.least(table.c.humidity_min, stmt.excluded.humidity_min),
+            "humidity_max": func.greatest(table.c.humidity_max, stmt.excluded.humidity_max),
+        },
+    )
+    return stmt
+
+def ingest_aggregate_statements(rows: List[dict]):
+    """Statements keeping summaries and rollups in step with a batch of new readings (shared with async_crud)."""
+    return [sensor_summary_upsert(rows), sensor_rollup_upsert(rows)]
+
+def _apply_ingest_aggregates(db: Session, rows: List[dict]):
+    for stmt in ingest_aggregate_statements(rows):
+        db.execute(stmt)
+
+def sensor_reading_row(reading: schemas.SensorReadingCreate, timestamp: datetime) -> dict:
+    """Column values of a reading; the client-side seq/timestamp are not stored."""
+    return {**reading.model_dump(exclude={"seq", "timestamp"}), "timestamp": timestamp}
+
+def readings_committed(rows: List[dict]):
+    """Post-commit hooks of new readings: live clients, the auto irrigation rules and ingest metrics."""
+    metrics.record_readings(rows)
+    live.hub.publish_readings(rows)
+    rules.engine.evaluate(rows)
+    etags.versions.bump("readings", *{"readings:" + row["sensor_id"] for row in rows})
+
+def sensor_reading_insert_stmt(row: dict):
+    return insert(models.SensorReading).values(**row).returning(models.SensorReading)
+
 def create_sensor_reading(db: Session, reading: schemas.SensorReadingCreate):
-    db_reading = models.SensorReading(**reading.model_dump())
-    db.add(db_reading)
+    row = sensor_reading_row(reading, datetime.utcnow())
+    db_reading = db.scalar(sensor_reading_insert_stmt(row))
+    _apply_ingest_aggregates(db, [row])
     db.commit()
-    db.refresh(db_reading)
+    readings_committed([{
+        "id": db_reading.id,
+        "sensor_id": db_reading.sensor_id,
+        "temperature": db_reading.temperature,
+        "humidity": db_reading.humidity,
+        "timestamp": db_reading.timestamp,
+    }])
     return db_reading
 
-def get_recent_readings(db: Session, limit: int = 100):
-    return db.query(models.SensorReading).order_by(models.SensorReading.timestamp.desc()).limit(limit).all()
+def create_sensor_readings_bulk(db: Session, readings: List[schemas.SensorReadingCreate], timestamps: Optional[List[datetime]] = None):
+    """
+    Writes a batch of readings with a single multi-row INSERT in one transaction.
+    `timestamps` (same length as `readings`) keeps the original arrival time when
+    the rows were buffered before being written.
+    Returns the number of rows written (no refresh, no ORM objects).
+    """
+    if not readings:
+        return 0
+    if timestamps is None:
+        timestamps = [datetime.utcnow()] * len(readings)
+    rows = [sensor_reading_row(reading, ts) for reading, ts in zip(readings, timestamps)]
+    stored = [dict(row._mapping) for row in db.execute(sensor_readings_bulk_insert_stmt(), rows)]
+    _apply_ingest_aggregates(db, rows)
+    db.commit()
+    readings_committed(stored)
+    return len(rows)
 
-def get_dashboard_stats(db: Session):
-    # Calculate averages
-    stats = db.query(
-        func.avg(models.SensorReading.temperature).label("avg_temp"),
-        func.avg(models.SensorReading.humidity).label("avg_hum"),
-        func.count(models.SensorReading.id).label("total")
-    ).first()
+def sensor_readings_bulk_insert_stmt():
+    # Multi-row INSERT (insertmanyvalues) that still hands back the generated ids,
+    # in parameter order, so batch and buffered readings reach live clients like single ones
+    table = models.SensorReading.__table__
+    return insert(table).returning(
+        table.c.id, table.c.sensor_id, table.c.temperature, table.c.humidity, table.c.timestamp,
+        sort_by_parameter_order=True
+    )
 
-    # Count distinct active sensors (simple approximation)
-    active_count = db.query(models.SensorReading.sensor_id).distinct().count()
+def get_recent_readings(db: Session, limit: int = 100, project: bool = False):
+    query = db.query(*schema_columns(models.SensorReading, schemas.SensorReading)) if project else db.query(models.SensorReading)
+    return query.order_by(models.SensorReading.timestamp.desc()).limit(limit).all()
 
+def get_sensor_readings_page(
+    db: Session,
+    sensor_id: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    after: Optional[Tuple[datetime, int]] = None,
+    limit: int = 100,
+    project: bool = False
+):
+    """
+    Newest-first page of readings using keyset pagination on (timestamp, id).
+    `after` is the (timestamp, id) of the last row of the previous page.
+    With `project`, rows are column tuples in schemas.SensorReading field order.
+    Returns (rows, has_more).
+    """
+    query = db.query(*schema_columns(models.SensorReading, schemas.SensorReading)) if project else db.query(models.SensorReading)
+    if sensor_id is not None:
+        query = query.filter(models.SensorReading.sensor_id == sensor_id)
+    if start is not None:
+        query = query.filter(models.SensorReading.timestamp >= start)
+    if end is not None:
+        query = query.filter(models.SensorReading.timestamp < end)
+    if after is not None:
+        query = query.filter(tuple_(models.SensorReading.timestamp, models.SensorReading.id) < tuple_(*after))
+    rows = query.order_by(
+        models.SensorReading.timestamp.desc(), models.SensorReading.id.desc()
+    ).limit(limit + 1).all()
+    return rows[:limit], len(rows) > limit
+
+def get_sensor_readings_range(db: Session, sensor_id: str, start: datetime, end: datetime, limit: int = 500):
+    return db.query(models.SensorReading).filter(
+        models.SensorReading.sensor_id == sensor_id,
+        models.SensorReading.timestamp >= start,
+        models.SensorReading.timestamp < end
+    ).order_by(models.SensorReading.timestamp.asc()).limit(limit).all()
+
+def get_oldest_reading_time(db: Session, sensor_id: str):
+    return db.query(func.min(models.SensorReading.timestamp)).filter(
+        models.SensorReading.sensor_id == sensor_id
+    ).scalar()
+
+def get_sensor_rollups(db: Session, sensor_id: str, resolution: str, start: datetime, end: datetime):
+    """
+    Rollup buckets of one sensor overlapping [start, end), oldest first, as history points.
+    """
+    rollups = db.query(models.SensorRollup).filter(
+        models.SensorRollup.sensor_id == sensor_id,
+        models.SensorRollup.resolution == resolution,
+        models.SensorRollup.bucket >= rollup_bucket(start, resolution),
+        models.SensorRollup.bucket < end
+    ).order_by(models.SensorRollup.bucket.asc()).all()
+    return [
+        {
+            "bucket": r.bucket,
+            "count": r.reading_count,
+            "temperature_avg": r.temperature_sum / r.reading_count,
+            "temperature_min": r.temperature_min,
+            "temperature_max": r.temperature_max,
+            "humidity_avg": r.humidity_sum / r.reading_count,
+            "humidity_min": r.humidity_min,
+            "humidity_max": r.humidity_max,
+        }
+        for r in rollups if r.reading_count
+    ]
+
+# Read from the running per-sensor aggregates (one row per sensor, not per reading)
+DASHBOARD_STATS_QUERY = select(
+    func.sum(models.SensorSummary.temperature_sum).label("temp_sum"),
+    func.sum(models.SensorSummary.humidity_sum).label("hum_sum"),
+    func.sum(models.SensorSummary.reading_count).label("total"),
+    func.count(models.SensorSummary.sensor_id).label("sensors")
+)
+
+def get_dashboard_stats(db: Session):
+    return dashboard_stats_from_row(db.execute(DASHBOARD_STATS_QUERY).one())
+
+def dashboard_stats_from_row(stats):
+    total = int(stats.total) if stats.total else 0
     return {
-        "avg_temperature": stats.avg_temp if stats.avg_temp else 0.0,
-        "avg_humidity": stats.avg_hum if stats.avg_hum else 0.0,
-        "total_readings": stats.total if stats.total else 0,
-        "active_sensors": active_count
+        "avg_temperature": stats.temp_sum / total if total else 0.0,
+        "avg_humidity": stats.hum_sum / total if total else 0.0,
+        "total_readings": total,
+        "active_sensors": stats.sensors
     }
 
+def rebuild_sensor_summaries(db: Session):
+    """
+    Recomputes sensor_summaries from the raw sensor_readings table.
+    The summary table is locked for the duration so concurrent ingests wait and
+    are applied on top of the rebuilt values instead of being lost.
+    """
+    readings = models.SensorReading
+    db.execute(text("LOCK TABLE dev.sensor_summaries IN EXCLUSIVE MODE"))
+    db.execute(delete(models.SensorSummary))
+    db.execute(
+        insert(models.SensorSummary.__table__).from_select(
+            ["sensor_id", "reading_count", "temperature_sum", "humidity_sum", "first_seen", "last_seen"],
+            select(
+                readings.sensor_id,
+                func.count(readings.id),
+                func.coalesce(func.sum(readings.temperature), 0.0),
+                func.coalesce(func.sum(readings.humidity), 0.0),
+                func.min(readings.timestamp),
+                func.max(readings.timestamp),
+            ).where(readings.sensor_id.isnot(None)).group_by(readings.sensor_id)
+        )
+    )
+    db.commit()
+    return db.query(models.SensorSummary).count()
+
+ROLLUP_REBUILD_SQL = """
+    INSERT INTO dev.sensor_rollups
+        (sensor_id, resolution, bucket, reading_count,
+         temperature_sum, temperature_min, temperature_max,
+         humidity_sum, humidity_min, humidity_max)
+    SELECT sensor_id, :resolution, date_trunc(:unit, timestamp), COUNT(id),
+           COALESCE(SUM(temperature), 0), MIN(temperature), MAX(temperature),
+           COALESCE(SUM(humidity), 0), MIN(humidity), MAX(humidity)
+    FROM dev.sensor_readings
+    WHERE sensor_id IS NOT NULL AND timestamp IS NOT NULL
+    GROUP BY sensor_id, 3
+"""
+
 # --- Irrigation CRUD ---
 def get_irrigation_zones(db: Session, skip: int = 0, limit: int = 100):
     return db.query(models.IrrigationZone).order_by(models.IrrigationZone.id.asc()).offset(skip).limit(limit).all()
 
+DEFAULT_IRRIGATION_ZONES = ["Sector Norte", "Sector Sur", "Invernadero", "Jardín Principal"]
+
+def seed_default_zones(db: Session) -> int:
+    """
+    Creates the default zones if there are none yet, in one INSERT ... SELECT.
+    The advisory lock makes concurrent callers seed only once. Returns the rows inserted.
+    """
+    db.execute(text("SELECT pg_advisory_xact_lock(hashtext('dev.irrigation_zones.seed'))"))
+    inserted = db.execute(
+        text("""
+            INSERT INTO dev.irrigation_zones (name, is_pump_active, mode, timer_seconds_remaining)
+            SELECT name, false, 'manual', 0 FROM unnest(CAST(:names AS text[])) WITH ORDINALITY AS d(name, position)
+            WHERE NOT EXISTS (SELECT 1 FROM dev.irrigation_zones)
+            ORDER BY position
+        """),
+        {"names": DEFAULT_IRRIGATION_ZONES}
+    ).rowcount
+    db.commit()
+    if inserted:
+        etags.versions.bump("zones")
+    return inserted
+
 def get_irrigation_zone(db: Session, zone_id: int):
     return db.query(models.IrrigationZone).filter(models.IrrigationZone.id == zone_id).first()
 
 def create_irrigation_zone(db: Session, zone: schemas.IrrigationZoneCreate):
-    db_zone = models.IrrigationZone(
-        name=zone.name,
-        is_pump_active=zone.is_pump_active,
-        mode=zone.mode
+    db_zone = db.scalar(
+        insert(models.IrrigationZone).values(
+            name=zone.name,
+            is_pump_active=zone.is_pump_active,
+            mode=zone.mode
+        ).returning(models.IrrigationZone)
     )
-    db.add(db_zone)
     db.commit()
-    db.refresh(db_zone)
+    etags.versions.bump("zones")
     return db_zone
 
-def update_irrigation_zone(db: Session, db_zone: models.IrrigationZone, zone_update: schemas.IrrigationZoneUpdate):
-    update_data = zone_update.model_dump(exclude_unset=True)
-    for key, value in update_data.items():
-        setattr(db_zone, key, value)
-    
-    db.add(db_zone)
+def _publish_zone(db_zone: models.IrrigationZone):
+    etags.versions.bump("zones")
+    zone = schemas.IrrigationZone.model_validate(db_zone).model_dump()
+    live.hub.publish_zone(zone)
+    mqtt.bridge.publish_zone_state(zone)
+    scheduler.timers.track(db_zone.id, db_zone.timer_ends_at)
+    rules.engine.track_zone(db_zone.id, db_zone.mode, db_zone.is_pump_active)
+
+def _zone_update_returning(db: Session, stmt):
+    db_zone = db.scalar(stmt.returning(models.IrrigationZone).execution_options(populate_existing=True))
     db.commit()
-    db.refresh(db_zone)
+    if db_zone:
+        _publish_zone(db_zone)
     return db_zone
 
+def update_irrigation_zone(db: Session, zone_id: int, zone_update: schemas.IrrigationZoneUpdate):
+    """
+    UPDATE ... RETURNING in one statement; None if the zone does not exist.
+    `timer_seconds_remaining` arms (or with 0 cancels) the zone's timer; switching
+    the pump off or leaving timer mode cancels it too.
+    """
+    update_data = zone_update.model_dump(exclude_unset=True)
+    if "timer_seconds_remaining" in update_data:
+        seconds = update_data["timer_seconds_remaining"] or 0
+        update_data["timer_ends_at"] = datetime.utcnow() + timedelta(seconds=seconds) if seconds > 0 else None
+    elif update_data.get("is_pump_active") is False or update_data.get("mode", "timer") != "timer":
+        update_data["timer_ends_at"] = None
+    stmt = update(models.IrrigationZone).where(models.IrrigationZone.id == zone_id)
+    stmt = stmt.values(**update_data) if update_data else stmt.values(id=models.IrrigationZone.id)
+    return _zone_update_returning(db, stmt)
+
+def toggle_irrigation_pump(db: Session, zone_id: int):
+    """
+    Flips the pump in SQL (no read first). Turning it ON switches the zone to manual mode,
+    turning it OFF keeps the current mode. Either way a running timer is cancelled.
+    """
+    zone = models.IrrigationZone
+    was_active = func.coalesce(zone.is_pump_active, False)
+    stmt = update(zone).where(zone.id == zone_id).values(
+        is_pump_active=~was_active,
+        mode=case((was_active, zone.mode), else_="manual"),
+        timer_ends_at=None
+    )
+    return _zone_update_returning(db, stmt)
+
+def get_running_timers(db: Session):
+    """(zone_id, timer_ends_at) of every running timer (partial index on timer_ends_at)."""
+    zone = models.IrrigationZone
+    return db.execute(select(zone.id, zone.timer_ends_at).where(zone.timer_ends_at.isnot(None))).all()
+
+def expire_irrigation_timers(db: Session, due: List[tuple]):
+    """
+    Switches off the pumps of the given (zone_id, deadline) timers in one UPDATE.
+    A zone whose deadline changed meanwhile (timer re-armed or cancelled) is left alone.
+    """
+    if not due:
+        return []
+    zone = models.IrrigationZone
+    db_zones = db.scalars(
+        update(zone)
+        .where(tuple_(zone.id, zone.timer_ends_at).in_(due))
+        .values(is_pump_active=False, timer_ends_at=None, last_watered=datetime.utcnow())
+        .returning(zone)
+        .execution_options(populate_existing=True)
+    ).all()
+    db.commit()
+    for db_zone in db_zones:
+        _publish_zone(db_zone)
+    return db_zones
+
+# --- Irrigation Rules CRUD ---
+def get_irrigation_rules(db: Session, zone_id: Optional[int] = None):
+    query = select(models.IrrigationRule).order_by(models.IrrigationRule.id)
+    if zone_id is not None:
+        query = query.where(models.IrrigationRule.zone_id == zone_id)
+    return db.scalars(query).all()
+
+def get_irrigation_rule(db: Session, rule_id: int):
+    return db.get(models.IrrigationRule, rule_id)
+
+def get_zone_states(db: Session):
+    zone = models.IrrigationZone
+    return db.execute(select(zone.id, zone.mode, zone.is_pump_active)).all()
+
+def reload_irrigation_rules(db: Session):
+    """Hands the whole rule set and zone modes to the in-memory engine (after a rule edit, and periodically)."""
+    rules.engine.load(get_irrigation_rules(db), get_zone_states(db))
+
+def sync_auto_zones(db: Session, demands: dict, zone_ids):
+    """
+    Stores rule demand flips ({rule_id: demand}) and switches the pumps of the given 'auto' zones
+    to match their enabled rules, in one transaction. Returns the zones whose pump changed.
+
+    Every worker runs this for the readings it ingests, so the database is the only shared state:
+    the zone rows are locked first (concurrent syncs of a zone queue up and then see each other's
+    demand), a demand is only written if it differs, and a pump only if it differs from what the
+    rules want, so a flip switches the pump (and sends its command) exactly once.
+    """
+    zone, rule = models.IrrigationZone, models.IrrigationRule
+    zone_ids = sorted(set(zone_ids))
+    if not zone_ids:
+        return []
+    db.execute(select(zone.id).where(zone.id.in_(zone_ids)).order_by(zone.id).with_for_update())
+    for demand in (True, False):
+        rule_ids = [rule_id for rule_id, wanted in demands.items() if wanted is demand]
+        if rule_ids:
+            db.execute(update(rule).where(rule.id.in_(rule_ids), rule.demand.is_not(demand)).values(demand=demand))
+    wanted = (
+        select(func.coalesce(func.bool_or(rule.demand), False))
+        .where(rule.zone_id == zone.id, rule.enabled.is_(True))
+        .scalar_subquery()
+    )
+    db_zones = db.scalars(
+        update(zone)
+        .where(zone.id.in_(zone_ids), zone.mode == "auto", zone.is_pump_active.is_distinct_from(wanted))
+        .values(is_pump_active=wanted)
+        .returning(zone)
+        .execution_options(populate_existing=True)
+    ).all()
+    db.commit()
+    for db_zone in db_zones:
+        _publish_zone(db_zone)
+    return db_zones
+
+def create_irrigation_rule(db: Session, rule: schemas.IrrigationRuleCreate):
+    zone = models.IrrigationZone
+    # A new rule starts from the zone's current pump state
+    demand = func.coalesce(select(zone.is_pump_active).where(zone.id == rule.zone_id).scalar_subquery(), False)
+    db_rule = db.scalar(
+        insert(models.IrrigationRule).values(**rule.model_dump(), demand=demand).returning(models.IrrigationRule)
+    )
+    db.commit()
+    reload_irrigation_rules(db)
+    return db_rule
+
+def update_irrigation_rule(db: Session, rule_id: int, values: dict):
+    db_rule = db.scalar(
+        update(models.IrrigationRule).where(models.IrrigationRule.id == rule_id).values(**values)
+        .returning(models.IrrigationRule).execution_options(populate_existing=True)
+    )
+    db.commit()
+    if db_rule:
+        reload_irrigation_rules(db)
+    return db_rule
+
+def delete_irrigation_rule(db: Session, rule_id: int):
+    """Returns the deleted rule id, or None if it did not exist."""
+    deleted = db.scalar(delete(models.IrrigationRule).where(models.IrrigationRule.id == rule_id).returning(models.IrrigationRule.id))
+    db.commit()
+    if deleted is not None:
+        reload_irrigation_rules(db)
+    return deleted
+
 # --- Admin/Message CRUD ---
+def last_login_stmt(user_id: int):
+    return update(models.User).where(models.User.id == user_id).values(
+        last_login=datetime.utcnow()
+    ).returning(models.User.email)
+
 def update_last_login(db: Session, user_id: int):
-    user = db.query(models.User).filter(models.User.id == user_id).first()
-    if user:
-        user.last_login = datetime.utcnow()
-        db.commit()
+    email = db.scalar(last_login_stmt(user_id))
+    db.commit()
+    users_changed(user_id, email)
 
 def create_user_message(db: Session, message: schemas.UserMessageCreate, user_id: int):
-    db_message = models.UserMessage(**message.model_dump(), user_id=user_id)
-    db.add(db_message)
+    db_message = db.scalar(
+        insert(models.UserMessage).values(**message.model_dump(), user_id=user_id).returning(models.UserMessage)
+    )
     db.commit()
-    db.refresh(db_message)
     return db_message
 
-def get_messages(db: Session, skip: int = 0, limit: int = 100):
-    msgs = db.query(models.UserMessage).order_by(models.UserMessage.created_at.desc()).offset(skip).limit(limit).all()
-    # Enrich with user email for convenience
-    for m in msgs:
-        if m.user: m.user_email = m.user.email
-    return msgs
+def get_messages_page(
+    db: Session,
+    unread_only: bool = False,
+    after: Optional[Tuple[datetime, int]] = None,
+    limit: int = 100
+):
+    """Newest-first page of messages, keyset pagination on (created_at, id). Returns (rows, has_more)."""
+    # Sender email comes from the same query (outer join), not from a lazy load per message
+    query = db.query(models.UserMessage, models.User.email).outerjoin(
+        models.User, models.UserMessage.user_id == models.User.id
+    )
+    if unread_only:
+        query = query.filter(~models.UserMessage.is_read) # Same predicate as the partial index
+    if after is not None:
+        query = query.filter(tuple_(models.UserMessage.created_at, models.UserMessage.id) < tuple_(*after))
+    rows = query.order_by(models.UserMessage.created_at.desc(), models.UserMessage.id.desc()).limit(limit + 1).all()
+    msgs = []
+    for m, email in rows[:limit]:
+        m.user_email = email
+        msgs.append(m)
+    return msgs, len(rows) > limit
 
 def get_admin_stats(db: Session):
-    total_users = db.query(models.User).count()
-    
-    # Active users in last 24h
+    """User counts for the admin dashboard in a single pass over dev.users (FILTER aggregates)."""
     one_day_ago = datetime.utcnow() - timedelta(days=1)
-    active_24h = db.query(models.User).filter(models.User.last_login >= one_day_ago).count()
-    
-    # Inactive users (> 7 days)
     seven_days_ago = datetime.utcnow() - timedelta(days=7)
-    # Users who haven't logged in for 7 days OR have never logged in (and created > 7 days ago)
-    inactive_7d = db.query(models.User).filter(
-        (models.User.last_login < seven_days_ago) | 
-        ((models.User.last_login == None) & (models.User.created_at < seven_days_ago))
-    ).count()
+    # Inactive: no login for 7 days, or never logged in and created > 7 days ago
+    last_activity = func.coalesce(models.User.last_login, models.User.created_at)
+    row = db.execute(
+        select(
+            func.count().label("total_users"),
+            func.count().filter(models.User.last_login >= one_day_ago).label("active_users_24h"),
+            func.count().filter(last_activity < seven_days_ago).label("inactive_users_7d"),
+        ).select_from(models.User)
+    ).one()
+    return dict(row._mapping)
 
-    return {
-        "total_users": total_users,
-        "active_users_24h": active_24h,
-        "system_uptime": "99.9%", # Placeholder or could be calculated from app start
-        "inactive_users_7d": inactive_7d
-    }
+def rebuild_sensor_rollups(db: Session):
+    """
+    Recomputes every rollup bucket from the raw sensor_readings table (same locking as the summaries).
+    """
+    db.execute(text("LOCK TABLE dev.sensor_rollups IN EXCLUSIVE MODE"))
+    db.execute(delete(models.SensorRollup))
+    for resolution, unit in (("1m", "minute"), ("1h", "hour"), ("1d", "day")):
+        db.execute(text(ROLLUP_REBUILD_SQL), {"resolution": resolution, "unit": unit})
+    db.commit()
+    return db.query(models.SensorRollup).count()
@@ -0,0 +1,105 @@
+"""
+Version-based ETags for the polled read endpoints.
+
+crud bumps an in-memory change counter after every committed write to the
+data behind a resource ("zones", "readings", "readings:<sensor_id>", "users").
+The ETag of a response is built from those counters (plus the query
+parameters that shape it), so an unchanged poll is answered 304 straight from
+the counters, before any database access.
+
+Counters are per process: a write served by another uvicorn worker does not
+bump them, and a poll reaching a worker that missed the write would get a
+stale 304. ETags are therefore off by default (ETAG_ENABLED=false); only set
+ETAG_ENABLED=true when the API runs as a single worker (or all writes and
+polls go to one). Each process tags its ETags with a random epoch, so ETags
+handed out by another worker or before a restart never match.
+"""
+import hashlib
+import os
+import threading
+import uuid
+from typing import Dict, Optional
+
+from fastapi import Request, Response
+
+ETAG_ENABLED = os.getenv("ETAG_ENABLED", "false").lower() in ("1", "true", "yes")
+
+_EPOCH = uuid.uuid4().hex[:8]
+
+
+class VersionRegistry:
+    def __init__(self):
+        self._versions: Dict[str, int] = {}
+        self._lock = threading.Lock() # Bumped from worker threads and the event loop
+
+        # Metrics, per resource: [304 answers, full answers]
+        self._requests: Dict[str, list] = {}
+
+    def bump(self, *keys: str):
+        with self._lock:
+            for key in keys:
+                self._versions[key] = self._versions.get(key, 0) + 1
+
+    def get(self, key: str) -> int:
+        return self._versions.get(key, 0)
+
+    def record(self, resource: str, not_modified: bool):
+        counts = self._requests.setdefault(resource, [0, 0])
+        counts[0 if not_modified else 1] += 1
+
+    def stats(self) -> dict:
+        resources = {}
+        for resource, (hits, misses) in self._requests.items():
+            resources[resource] = {
+                "not_modified": hits,
+                "full": misses,
+                "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+            }
+        hits = sum(counts[0] for counts in self._requests.values())
+        total = sum(sum(counts) for counts in self._requests.values())
+        return {
+            "enabled": ETAG_ENABLED,
+            "hit_rate": hits / total if total else 0.0,
+            "resources": resources,
+        }
+
+
+versions = VersionRegistry()
+
+
+def make_etag(*parts) -> str:
+    digest = hashlib.blake2b(repr(parts).encode(), digest_size=8).hexdigest()
+    return f'W/"{_EPOCH}-{digest}"'
+
+
+def _matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison (RFC 9110): ignore the W/ prefix on both sides
+    wanted = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == wanted:
+            return True
+    return False
+
+
+def conditional(request: Request, response: Response, resource: str, *parts) -> Optional[Response]:
+    """
+    Returns a 304 response if the client's If-None-Match still matches, else sets
+    the ETag on `response` and returns None (the endpoint then builds the body).
+    `parts` must cover everything the body depends on (versions, query parameters).
+    """
+    if not ETAG_ENABLED:
+        return None
+    etag = make_etag(resource, *parts)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"} # Browsers revalidate every poll
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _matches(if_none_match, etag):
+        versions.record(resource, True)
+        return Response(status_code=304, headers=headers)
+    versions.record(resource, False)
+    response.headers.update(headers)
+    return None
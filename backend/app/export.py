@@ -0,0 +1,95 @@
+"""
+Streaming export of raw sensor readings as CSV or NDJSON.
+
+Rows are read with a server-side cursor (yield_per) as plain tuples, no ORM
+objects or Pydantic models, and encoded EXPORT_CHUNK_SIZE rows at a time, so
+memory stays bounded by one chunk however large the export is. The generator
+opens its own session: it runs after the endpoint has returned, when request
+dependencies are already closed.
+
+Only readings still in Postgres are exported; partitions moved to cold storage
+are in the Parquet archive (app/archive.py).
+"""
+import csv
+import io
+import json
+import os
+import zlib
+from datetime import datetime
+from typing import Iterator, Optional
+
+from sqlalchemy import select
+
+from . import models
+from .database import SessionLocal
+
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "5000"))
+
+FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+COLUMNS = ("id", "sensor_id", "temperature", "humidity", "timestamp")
+
+
+def readings_query(sensor_id: Optional[str], start: Optional[datetime], end: Optional[datetime], chunk_size: int):
+    readings = models.SensorReading
+    query = select(readings.id, readings.sensor_id, readings.temperature, readings.humidity, readings.timestamp)
+    if sensor_id is not None:
+        query = query.where(readings.sensor_id == sensor_id)
+    if start is not None:
+        query = query.where(readings.timestamp >= start)
+    if end is not None:
+        query = query.where(readings.timestamp < end)
+    return query.order_by(readings.timestamp, readings.id).execution_options(yield_per=chunk_size)
+
+
+def _csv_chunk(rows, header: bool) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    if header:
+        writer.writerow(COLUMNS)
+    writer.writerows((r[0], r[1], r[2], r[3], r[4].isoformat()) for r in rows)
+    return buffer.getvalue()
+
+
+def _ndjson_chunk(rows) -> str:
+    dumps = json.dumps
+    return "".join(
+        dumps({"id": r[0], "sensor_id": r[1], "temperature": r[2], "humidity": r[3], "timestamp": r[4].isoformat()}) + "\n"
+        for r in rows
+    )
+
+
+def _encoded(fmt: str, sensor_id, start, end, chunk_size: int) -> Iterator[bytes]:
+    db = SessionLocal()
+    try:
+        if fmt == "csv":
+            yield _csv_chunk((), header=True).encode()
+        result = db.execute(readings_query(sensor_id, start, end, chunk_size))
+        for chunk in result.partitions():
+            text = _csv_chunk(chunk, header=False) if fmt == "csv" else _ndjson_chunk(chunk)
+            yield text.encode()
+    finally:
+        db.close() # Also when the client disconnects mid-export (generator closed)
+
+
+def stream_readings(
+    fmt: str,
+    sensor_id: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    gzip: bool = False,
+    chunk_size: int = EXPORT_CHUNK_SIZE
+) -> Iterator[bytes]:
+    """Body of an export response; with `gzip` the chunks form one gzip stream."""
+    chunks = _encoded(fmt, sensor_id, start, end, chunk_size)
+    if not gzip:
+        yield from chunks
+        return
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) # wbits=31: gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
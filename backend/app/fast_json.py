@@ -0,0 +1,64 @@
+"""
+Fast path for large read responses.
+
+Instead of loading ORM objects, validating each through a from_attributes
+Pydantic model and encoding the result with the standard JSON encoder, the
+endpoint asks crud for plain column tuples (`project=True`, columns in the
+field order of the response schema) and returns them through
+FastJSONResponse, encoded by orjson in one call. The JSON is the same as the
+response_model produces; the per-row validation is what is skipped.
+
+FAST_JSON_ENABLED=false restores the regular path. orjson is optional: without
+it the fast path still skips ORM objects and Pydantic, encoding with json.
+"""
+import json
+import os
+from datetime import date, datetime
+from typing import Iterable, List, Optional, Type
+
+from fastapi import Response
+from pydantic import BaseModel
+
+FAST_JSON_ENABLED = os.getenv("FAST_JSON_ENABLED", "true").lower() in ("1", "true", "yes")
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content)
+    # Same output as FastAPI's JSONResponse
+    return json.dumps(content, default=_default, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+def fields(schema: Type[BaseModel]) -> tuple:
+    """Field names of a response schema, in serialization order."""
+    return tuple(schema.model_fields)
+
+
+def as_dicts(schema: Type[BaseModel], rows: Iterable) -> List[dict]:
+    """Column tuples (projected in `fields(schema)` order) as the dicts `schema` would serialize to."""
+    keys = fields(schema)
+    return [dict(zip(keys, row)) for row in rows]
+
+
+def respond(content, response: Optional[Response] = None) -> FastJSONResponse:
+    # A returned Response bypasses the injected one: carry its headers (ETag, ...) over
+    headers = dict(response.headers) if response is not None else None
+    return FastJSONResponse(content, headers=headers)
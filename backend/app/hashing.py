@@ -0,0 +1,96 @@
+"""
+Bounded worker pool for bcrypt.
+
+bcrypt costs hundreds of milliseconds of CPU per call. Running it inline in
+/token or /users/ ties up request threads during a login burst, so hashing and
+verification run on a dedicated pool of PASSWORD_HASH_WORKERS threads (bcrypt
+releases the GIL). At most PASSWORD_HASH_MAX_PENDING operations may be running
+or queued; beyond that PasswordHasherBusy is raised and the API answers 503
+instead of letting the queue (and everyone's latency) grow.
+"""
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from . import crud, metrics
+
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "32"))
+
+
+class PasswordHasherBusy(Exception):
+    """Too many hash operations pending; the caller should retry later."""
+
+
+class _OpStats:
+    def __init__(self):
+        self.count = 0
+        self.total_seconds = 0.0 # Wait in queue + bcrypt
+        self.max_seconds = 0.0
+        self.compute_seconds = 0.0 # bcrypt only
+
+    def as_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "avg_seconds": self.total_seconds / self.count if self.count else 0.0,
+            "max_seconds": self.max_seconds,
+            "avg_compute_seconds": self.compute_seconds / self.count if self.count else 0.0,
+        }
+
+
+class PasswordHasher:
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._pending = 0 # Only touched from the event loop thread
+        self.shed_total = 0
+        self._stats = {"hash": _OpStats(), "verify": _OpStats()}
+
+    async def hash(self, password: str) -> str:
+        return await self._run("hash", crud.get_password_hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run("verify", crud.verify_password, plain_password, hashed_password)
+
+    async def _run(self, op: str, fn, *args):
+        if self._pending >= self.max_pending:
+            self.shed_total += 1
+            raise PasswordHasherBusy()
+        self._pending += 1
+        stats = self._stats[op]
+        started = time.perf_counter()
+        try:
+            result, compute = await asyncio.get_running_loop().run_in_executor(self._executor, _timed, fn, args)
+        finally:
+            self._pending -= 1
+        elapsed = time.perf_counter() - started
+        stats.count += 1
+        stats.total_seconds += elapsed
+        stats.compute_seconds += compute
+        stats.max_seconds = max(stats.max_seconds, elapsed)
+        metrics.password_hash_seconds.observe(compute, op)
+        return result
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "pending": self._pending,
+            "max_pending": self.max_pending,
+            "shed_total": self.shed_total,
+            "hash": self._stats["hash"].as_dict(),
+            "verify": self._stats["verify"].as_dict(),
+        }
+
+
+def _timed(fn, args):
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - started
+
+
+hasher = PasswordHasher(PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING)
@@ -0,0 +1,190 @@
+"""
+Ingest-stage filter for sensor readings: duplicate suppression, deadband and heartbeat.
+
+- Duplicates: a reading carrying a `seq` (or, failing that, a device `timestamp`)
+  already seen recently for the same sensor is a retransmission and is dropped.
+- Deadband: a reading whose temperature and humidity both moved less than the
+  sensor's thresholds since the last *stored* reading is dropped...
+- Heartbeat: ...unless that stored reading is older than the heartbeat interval,
+  so every sensor still lands at least one row per interval.
+
+Thresholds default to 0 (deadband off). Per-sensor values come from
+INGEST_FILTER_OVERRIDES, a JSON object such as
+    {"esp32-01": {"temperature": 0.2, "humidity": 1.0, "heartbeat": 60}}
+
+State is per process (like auth_cache): with several workers a retransmission
+that lands on another worker is not recognised.
+"""
+import json
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Optional
+
+from . import schemas
+
+INGEST_FILTER_ENABLED = os.getenv("INGEST_FILTER_ENABLED", "true").lower() in ("1", "true", "yes")
+INGEST_DEADBAND_TEMPERATURE = float(os.getenv("INGEST_DEADBAND_TEMPERATURE", "0"))
+INGEST_DEADBAND_HUMIDITY = float(os.getenv("INGEST_DEADBAND_HUMIDITY", "0"))
+INGEST_HEARTBEAT_SECONDS = float(os.getenv("INGEST_HEARTBEAT_SECONDS", "300"))
+INGEST_DEDUP_WINDOW = int(os.getenv("INGEST_DEDUP_WINDOW", "64")) # Recent seq/timestamps remembered per sensor
+INGEST_FILTER_MAX_SENSORS = int(os.getenv("INGEST_FILTER_MAX_SENSORS", "10000"))
+
+DUPLICATE = "duplicate"
+DEADBAND = "deadband"
+
+
+def _load_overrides() -> dict:
+    raw = os.getenv("INGEST_FILTER_OVERRIDES", "")
+    if not raw:
+        return {}
+    try:
+        overrides = json.loads(raw)
+    except ValueError:
+        print("WARNING: INGEST_FILTER_OVERRIDES is not valid JSON, ignoring it")
+        return {}
+    return {sensor_id: dict(values) for sensor_id, values in overrides.items()}
+
+
+def _within(change: float, band: float) -> bool:
+    # A band of 0 only tolerates an identical value
+    return abs(change) < band if band > 0 else change == 0
+
+
+class _SensorState:
+    __slots__ = ("recent_keys", "recent_order", "temperature", "humidity", "stored_at")
+
+    def __init__(self):
+        self.recent_keys = set()
+        self.recent_order = deque()
+        self.temperature = None
+        self.humidity = None
+        self.stored_at = None # monotonic time of the last admitted reading
+
+
+class IngestFilter:
+    def __init__(self, temperature: float, humidity: float, heartbeat: float,
+                 dedup_window: int, max_sensors: int, overrides: Optional[dict] = None):
+        self.temperature = temperature
+        self.humidity = humidity
+        self.heartbeat = heartbeat
+        self.dedup_window = dedup_window
+        self.max_sensors = max_sensors
+        self.overrides = overrides or {}
+        self.enabled = INGEST_FILTER_ENABLED
+        self._sensors: "OrderedDict[str, _SensorState]" = OrderedDict()
+        self._lock = threading.Lock() # Also fed from the MQTT bridge thread
+
+        # Metrics
+        self.accepted = 0
+        self.duplicates = 0
+        self.deadband_skipped = 0
+        self.heartbeats = 0 # Inside the deadband but stored because the heartbeat was due
+
+    def _settings(self, sensor_id: str):
+        override = self.overrides.get(sensor_id)
+        if not override:
+            return self.temperature, self.humidity, self.heartbeat
+        return (
+            float(override.get("temperature", self.temperature)),
+            float(override.get("humidity", self.humidity)),
+            float(override.get("heartbeat", self.heartbeat)),
+        )
+
+    @staticmethod
+    def _key(reading: schemas.SensorReadingCreate):
+        if reading.seq is not None:
+            return ("seq", reading.seq)
+        if reading.timestamp is not None:
+            return ("ts", reading.timestamp)
+        return None
+
+    def _state(self, sensor_id: str) -> _SensorState:
+        state = self._sensors.get(sensor_id)
+        if state is None:
+            state = self._sensors[sensor_id] = _SensorState()
+            while len(self._sensors) > self.max_sensors:
+                self._sensors.popitem(last=False)
+        else:
+            self._sensors.move_to_end(sensor_id)
+        return state
+
+    def admit(self, reading: schemas.SensorReadingCreate) -> Optional[str]:
+        """
+        Returns None if the reading should be stored (and records it as the
+        sensor's last stored value), otherwise DUPLICATE or DEADBAND.
+        """
+        if not self.enabled:
+            return None
+        key = self._key(reading)
+        now = time.monotonic()
+        with self._lock:
+            state = self._state(reading.sensor_id)
+            if key is not None and key in state.recent_keys:
+                self.duplicates += 1
+                return DUPLICATE
+
+            temperature_band, humidity_band, heartbeat = self._settings(reading.sensor_id)
+            if state.stored_at is not None and (temperature_band > 0 or humidity_band > 0):
+                unchanged = (
+                    _within(reading.temperature - state.temperature, temperature_band)
+                    and _within(reading.humidity - state.humidity, humidity_band)
+                )
+                if unchanged:
+                    if now - state.stored_at < heartbeat:
+                        self.deadband_skipped += 1
+                        return DEADBAND
+                    self.heartbeats += 1
+
+            if key is not None:
+                state.recent_keys.add(key)
+                state.recent_order.append(key)
+                if len(state.recent_order) > self.dedup_window:
+                    state.recent_keys.discard(state.recent_order.popleft())
+            state.temperature = reading.temperature
+            state.humidity = reading.humidity
+            state.stored_at = now
+            self.accepted += 1
+            return None
+
+    def discard(self, reading: schemas.SensorReadingCreate):
+        """
+        Undoes the bookkeeping of an admitted reading whose write failed, so the
+        device's retry is neither a duplicate nor inside the deadband.
+        """
+        key = self._key(reading)
+        with self._lock:
+            state = self._sensors.get(reading.sensor_id)
+            if state is None:
+                return
+            state.stored_at = None # Next reading is stored whatever its value
+            if key is not None and key in state.recent_keys:
+                state.recent_keys.discard(key)
+                state.recent_order.remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._sensors.clear()
+
+    def stats(self) -> dict:
+        seen = self.accepted + self.duplicates + self.deadband_skipped
+        return {
+            "enabled": self.enabled,
+            "sensors_tracked": len(self._sensors),
+            "accepted": self.accepted,
+            "duplicates": self.duplicates,
+            "deadband_skipped": self.deadband_skipped,
+            "heartbeats": self.heartbeats,
+            "skip_rate": (self.duplicates + self.deadband_skipped) / seen if seen else 0.0,
+        }
+
+
+gate = IngestFilter(
+    INGEST_DEADBAND_TEMPERATURE,
+    INGEST_DEADBAND_HUMIDITY,
+    INGEST_HEARTBEAT_SECONDS,
+    INGEST_DEDUP_WINDOW,
+    INGEST_FILTER_MAX_SENSORS,
+    _load_overrides(),
+)
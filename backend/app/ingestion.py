@@ -0,0 +1,177 @@
+"""
+Write-behind buffer for sensor ingestion.
+
+When enabled (INGEST_BUFFER_ENABLED=true), POST /sensors/data only enqueues the
+reading and a single background worker writes the queue to dev.sensor_readings
+in batches, either when INGEST_FLUSH_SIZE readings are waiting or when
+INGEST_FLUSH_INTERVAL seconds have passed since the first one arrived.
+The queue is bounded (INGEST_BUFFER_MAX_SIZE); when it is full new readings are
+refused so the endpoint can answer 429 instead of growing memory without limit.
+"""
+import asyncio
+import os
+import time
+from datetime import datetime
+from typing import List, Optional
+
+from . import async_crud, schemas
+from .database import AsyncSessionLocal
+
+INGEST_BUFFER_ENABLED = os.getenv("INGEST_BUFFER_ENABLED", "false").lower() in ("1", "true", "yes")
+INGEST_BUFFER_MAX_SIZE = int(os.getenv("INGEST_BUFFER_MAX_SIZE", "10000"))
+INGEST_FLUSH_SIZE = int(os.getenv("INGEST_FLUSH_SIZE", "500"))
+INGEST_FLUSH_INTERVAL = float(os.getenv("INGEST_FLUSH_INTERVAL", "1.0"))
+INGEST_FLUSH_RETRIES = int(os.getenv("INGEST_FLUSH_RETRIES", "3"))
+INGEST_SHUTDOWN_TIMEOUT = float(os.getenv("INGEST_SHUTDOWN_TIMEOUT", "30"))
+
+_STOP = object() # Shutdown sentinel placed at the end of the queue
+
+
+class IngestionBufferFull(Exception):
+    """Raised when the buffer cannot take more readings (full or shutting down)."""
+
+
+class IngestionBuffer:
+    def __init__(self, max_size: int, flush_size: int, flush_interval: float):
+        self.max_size = max_size
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self._queue: Optional[asyncio.Queue] = None
+        self._batch_ready: Optional[asyncio.Event] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._stopping = False
+
+        # Metrics
+        self.enqueued_total = 0
+        self.rejected_total = 0
+        self.written_total = 0
+        self.dropped_total = 0
+        self.flush_count = 0
+        self.flush_errors = 0
+        self.last_flush_size = 0
+        self.last_flush_seconds = 0.0
+        self.max_flush_seconds = 0.0
+        self.total_flush_seconds = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._worker is not None and not self._stopping
+
+    async def start(self):
+        if self._worker is not None:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_size)
+        self._batch_ready = asyncio.Event()
+        self._stopping = False
+        self._worker = asyncio.create_task(self._run())
+        print(f"Ingestion buffer started (max={self.max_size}, flush={self.flush_size}/{self.flush_interval}s)")
+
+    async def stop(self):
+        """Stops accepting readings and waits until everything queued is written."""
+        if self._worker is None:
+            return
+        self._stopping = True
+        await self._queue.put(_STOP)
+        self._batch_ready.set()
+        try:
+            await asyncio.wait_for(self._worker, timeout=INGEST_SHUTDOWN_TIMEOUT)
+        except asyncio.TimeoutError:
+            print(f"WARNING: ingestion buffer drain timed out, {self._queue.qsize()} readings lost")
+        self._worker = None
+
+    def enqueue(self, reading: schemas.SensorReadingCreate):
+        """Must be called from the event loop thread."""
+        if not self.running:
+            self.rejected_total += 1
+            raise IngestionBufferFull()
+        try:
+            self._queue.put_nowait((reading, datetime.utcnow()))
+        except asyncio.QueueFull:
+            self.rejected_total += 1
+            raise IngestionBufferFull()
+        self.enqueued_total += 1
+        if self._queue.qsize() >= self.flush_size:
+            self._batch_ready.set()
+
+    async def _run(self):
+        stop = False
+        while not stop:
+            first = await self._queue.get()
+            if first is _STOP:
+                break
+            batch = [first]
+            if self._queue.qsize() + 1 < self.flush_size:
+                # Wait for a full batch, but never longer than the flush window
+                try:
+                    await asyncio.wait_for(self._batch_ready.wait(), timeout=self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+            self._batch_ready.clear()
+            stop = self._take(batch)
+            await self._flush(batch)
+
+        # Drain whatever is still queued behind the sentinel
+        while not self._queue.empty():
+            batch = []
+            self._take(batch)
+            if batch:
+                await self._flush(batch)
+
+    def _take(self, batch: List) -> bool:
+        """Moves queued items into `batch` up to flush_size. Returns True if the sentinel was seen."""
+        saw_stop = False
+        while len(batch) < self.flush_size and not self._queue.empty():
+            item = self._queue.get_nowait()
+            if item is _STOP:
+                saw_stop = True
+                continue
+            batch.append(item)
+        return saw_stop
+
+    async def _flush(self, batch: List):
+        readings = [reading for reading, _ in batch]
+        timestamps = [received_at for _, received_at in batch]
+        for attempt in range(1, INGEST_FLUSH_RETRIES + 1):
+            started = time.perf_counter()
+            try:
+                await _write_batch(readings, timestamps)
+            except Exception as e:
+                self.flush_errors += 1
+                print(f"ERROR: ingestion flush of {len(batch)} readings failed (attempt {attempt}): {e}")
+                await asyncio.sleep(min(2 ** attempt * 0.1, 2.0))
+                continue
+            elapsed = time.perf_counter() - started
+            self.flush_count += 1
+            self.written_total += len(batch)
+            self.last_flush_size = len(batch)
+            self.last_flush_seconds = elapsed
+            self.total_flush_seconds += elapsed
+            self.max_flush_seconds = max(self.max_flush_seconds, elapsed)
+            return
+        self.dropped_total += len(batch)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.running,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "queue_capacity": self.max_size,
+            "enqueued_total": self.enqueued_total,
+            "rejected_total": self.rejected_total,
+            "written_total": self.written_total,
+            "dropped_total": self.dropped_total,
+            "flush_count": self.flush_count,
+            "flush_errors": self.flush_errors,
+            "last_flush_size": self.last_flush_size,
+            "avg_flush_size": self.written_total / self.flush_count if self.flush_count else 0.0,
+            "last_flush_seconds": self.last_flush_seconds,
+            "avg_flush_seconds": self.total_flush_seconds / self.flush_count if self.flush_count else 0.0,
+            "max_flush_seconds": self.max_flush_seconds,
+        }
+
+
+async def _write_batch(readings: List[schemas.SensorReadingCreate], timestamps: List[datetime]):
+    async with AsyncSessionLocal() as db:
+        await async_crud.create_sensor_readings_bulk(db, readings, timestamps)
+
+
+buffer = IngestionBuffer(INGEST_BUFFER_MAX_SIZE, INGEST_FLUSH_SIZE, INGEST_FLUSH_INTERVAL)
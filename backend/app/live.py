@@ -0,0 +1,116 @@
+"""
+In-process fan-out hub for live updates (served as SSE on GET /events).
+
+crud publishes every committed SensorReading and IrrigationZone change here.
+Each connected client has its own bounded queue and an optional filter on
+sensor/zone IDs. Publishing never waits: a client whose queue is full is
+dropped (it reconnects and resyncs), so one slow browser cannot hold back the rest.
+publish_* may be called from worker threads; delivery happens on the event loop.
+"""
+import asyncio
+import json
+import os
+from typing import Optional, Set
+
+LIVE_CLIENT_QUEUE_SIZE = int(os.getenv("LIVE_CLIENT_QUEUE_SIZE", "256"))
+
+DROPPED = object() # Sentinel handed to a client that fell too far behind
+
+
+class Subscriber:
+    def __init__(self, topics: Set[str], sensors: Optional[Set[str]], zones: Optional[Set[int]], queue_size: int):
+        self.topics = topics
+        self.sensors = sensors
+        self.zones = zones
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+
+    def wants(self, topic: str, key) -> bool:
+        if topic not in self.topics:
+            return False
+        if topic == "readings":
+            return self.sensors is None or key in self.sensors
+        return self.zones is None or key in self.zones
+
+
+class LiveHub:
+    def __init__(self, queue_size: int):
+        self.queue_size = queue_size
+        self._subscribers: Set[Subscriber] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+        # Metrics
+        self.published_total = 0
+        self.delivered_total = 0
+        self.dropped_clients_total = 0
+
+    def bind(self, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+
+    def subscribe(self, topics: Set[str], sensors: Optional[Set[str]] = None, zones: Optional[Set[int]] = None) -> Subscriber:
+        subscriber = Subscriber(topics, sensors, zones, self.queue_size)
+        self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        self._subscribers.discard(subscriber)
+
+    def publish_readings(self, rows):
+        """rows: dicts with sensor_id, temperature, humidity, timestamp (and id if known)."""
+        if not self._subscribers:
+            return
+        for row in rows:
+            self._publish("readings", "reading", row["sensor_id"], row)
+
+    def publish_zone(self, zone: dict):
+        if not self._subscribers:
+            return
+        self._publish("zones", "zone", zone["id"], zone)
+
+    def _publish(self, topic: str, event: str, key, payload: dict):
+        if self._loop is None:
+            return
+        # Encoded once, shared by every subscriber
+        message = f"event: {event}\ndata: {json.dumps(payload, default=_json_default)}\n\n"
+        try:
+            on_loop = asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            on_loop = False
+        if on_loop:
+            self._fan_out(topic, key, message)
+        else:
+            self._loop.call_soon_threadsafe(self._fan_out, topic, key, message)
+
+    def _fan_out(self, topic: str, key, message: str):
+        self.published_total += 1
+        for subscriber in list(self._subscribers):
+            if not subscriber.wants(topic, key):
+                continue
+            try:
+                subscriber.queue.put_nowait(message)
+                self.delivered_total += 1
+            except asyncio.QueueFull:
+                self._drop(subscriber)
+
+    def _drop(self, subscriber: Subscriber):
+        self._subscribers.discard(subscriber)
+        self.dropped_clients_total += 1
+        while not subscriber.queue.empty():
+            subscriber.queue.get_nowait()
+        subscriber.queue.put_nowait(DROPPED)
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": len(self._subscribers),
+            "published_total": self.published_total,
+            "delivered_total": self.delivered_total,
+            "dropped_clients_total": self.dropped_clients_total,
+        }
+
+
+def _json_default(value):
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
+
+
+hub = LiveHub(LIVE_CLIENT_QUEUE_SIZE)
@@ -1,9 +1,15 @@
-from fastapi import FastAPI, Depends, HTTPException, Header, status
+from fastapi import FastAPI, BackgroundTasks, Depends, HTTPException, Header, Query, Request, Response, status
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from pydantic import ValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List, Optional
-from . import crud, models, schemas
-from .database import engine, get_db
+from fastapi.responses import JSONResponse, StreamingResponse
+from typing import List, Optional, Union
+import asyncio
+import time
+from . import admin_stats, archive, async_crud, auth_cache, crud, etags, export, fast_json, hashing, ingest_filter, ingestion, live, metrics, models, mqtt, pagination, partitions, rules, scheduler, schemas, zone_cache
+from .database import SessionLocal, async_engine, engine, get_async_db, get_db, pool_stats
+from sqlalchemy.ext.asyncio import AsyncSession
 
 # Database initialization is now handled by Alembic migrations
 # Run `alembic upgrade head` to apply changes
@@ -23,6 +29,129 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(metrics.MetricsMiddleware)
+
+# --- Lifecycle ---
+lifecycle_tasks = []
+
+async def partition_maintenance_loop():
+    # Keeps upcoming sensor_readings partitions created and applies retention
+    while True:
+        try:
+            await run_in_threadpool(partitions.run_maintenance)
+        except Exception as e:
+            print(f"ERROR: partition maintenance failed: {e}")
+        await asyncio.sleep(partitions.PARTITION_MAINTENANCE_INTERVAL)
+
+def expire_irrigation_timers(due):
+    # Runs in a worker thread when timers reach their deadline (see app/scheduler.py)
+    db = SessionLocal()
+    try:
+        zones = crud.expire_irrigation_timers(db, due)
+    finally:
+        db.close()
+    for zone in zones:
+        mqtt.bridge.send_command(zone.id, "off")
+
+def sync_auto_zones(demands, zone_ids):
+    # Runs in a worker thread when the rules engine sees a rule flip or a stale 'auto' zone (see app/rules.py)
+    db = SessionLocal()
+    try:
+        zones = crud.sync_auto_zones(db, demands, zone_ids)
+    finally:
+        db.close()
+    for zone in zones:
+        mqtt.bridge.send_command(zone.id, "on" if zone.is_pump_active else "off")
+    return zones
+
+def load_irrigation_rules():
+    db = SessionLocal()
+    try:
+        return crud.get_irrigation_rules(db), crud.get_zone_states(db)
+    finally:
+        db.close()
+
+async def rules_reload_loop():
+    # Picks up rule edits, demand flips and zone mode changes made by the other workers
+    while True:
+        await asyncio.sleep(rules.RULES_RELOAD_SECONDS)
+        try:
+            rules.engine.load(*await run_in_threadpool(load_irrigation_rules))
+        except Exception as e:
+            print(f"ERROR: could not reload irrigation rules: {e}")
+
+def load_running_timers():
+    db = SessionLocal()
+    try:
+        return crud.get_running_timers(db)
+    finally:
+        db.close()
+
+def restore_running_timers(running_timers):
+    for zone_id, ends_at in running_timers:
+        scheduler.timers.track(zone_id, ends_at)
+
+STARTUP_RETRY_MAX_SECONDS = 60
+
+async def load_with_retry(what: str, load, apply):
+    # A startup load failed (e.g. database not reachable yet): retry with exponential backoff
+    delay = 1
+    while True:
+        await asyncio.sleep(delay)
+        try:
+            result = await run_in_threadpool(load)
+        except Exception as e:
+            delay = min(delay * 2, STARTUP_RETRY_MAX_SECONDS)
+            print(f"ERROR: could not load {what}, retrying in {delay}s: {e}")
+            continue
+        apply(result)
+        print(f"Loaded {what} after retrying")
+        return
+
+@app.on_event("startup")
+async def startup():
+    metrics.install_sql_hooks()
+    live.hub.bind(asyncio.get_running_loop())
+    try:
+        running_timers = await run_in_threadpool(load_running_timers)
+    except Exception as e:
+        print(f"ERROR: could not restore irrigation timers, retrying in the background: {e}")
+        running_timers = []
+        lifecycle_tasks.append(asyncio.create_task(
+            load_with_retry("irrigation timers", load_running_timers, restore_running_timers)
+        ))
+    scheduler.timers.start(asyncio.get_running_loop(), expire_irrigation_timers, running_timers)
+    try:
+        irrigation_rules, zone_states = await run_in_threadpool(load_irrigation_rules)
+    except Exception as e:
+        print(f"ERROR: could not load irrigation rules, retrying in the background: {e}")
+        irrigation_rules, zone_states = [], []
+        if rules.RULES_RELOAD_SECONDS <= 0:
+            lifecycle_tasks.append(asyncio.create_task(
+                load_with_retry("irrigation rules", load_irrigation_rules, lambda loaded: rules.engine.load(*loaded))
+            ))
+    rules.engine.start(asyncio.get_running_loop(), sync_auto_zones, irrigation_rules, zone_states)
+    if rules.RULES_RELOAD_SECONDS > 0:
+        # Also the startup retry: the first successful reload fills an empty engine
+        lifecycle_tasks.append(asyncio.create_task(rules_reload_loop()))
+    if ingestion.INGEST_BUFFER_ENABLED or mqtt.MQTT_ENABLED:
+        # MQTT readings always go through the write-behind buffer
+        await ingestion.buffer.start()
+    if mqtt.MQTT_ENABLED:
+        mqtt.bridge.start(asyncio.get_running_loop(), ingestion.buffer.enqueue)
+    if partitions.PARTITION_MAINTENANCE_ENABLED:
+        lifecycle_tasks.append(asyncio.create_task(partition_maintenance_loop()))
+
+@app.on_event("shutdown")
+async def shutdown():
+    for task in lifecycle_tasks:
+        task.cancel()
+    await scheduler.timers.stop()
+    mqtt.bridge.stop()
+    # Drain buffered readings before the process exits
+    await ingestion.buffer.stop()
+    hashing.hasher.shutdown()
+    await async_engine.dispose()
 
 # --- Dependencies ---
 import os
@@ -46,14 +175,26 @@ async def verify_sensor_token(x_sensor_token: Optional[str] = Header(None)):
 def read_root():
     return {"message": "ULEAM IoT Backend Running"}
 
+@app.exception_handler(hashing.PasswordHasherBusy)
+async def password_hasher_busy_handler(request: Request, exc: hashing.PasswordHasherBusy):
+    # Login storm: shed instead of queueing behind bcrypt
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Authentication service busy, retry later"},
+        headers={"Retry-After": "1"},
+    )
+
 # User Registration
 @app.post("/users/", response_model=schemas.User)
-def create_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
+async def create_user(user: schemas.UserCreate, db: AsyncSession = Depends(get_async_db)):
     try:
-        db_user = crud.get_user_by_email(db, email=user.email)
+        db_user = await async_crud.get_user_by_email(db, email=user.email)
         if db_user:
             raise HTTPException(status_code=400, detail="Email already registered")
-        return crud.create_user(db=db, user=user)
+        hashed_password = await hashing.hasher.hash(user.password)
+        return await async_crud.create_user(db=db, user=user, hashed_password=hashed_password)
+    except (HTTPException, hashing.PasswordHasherBusy):
+        raise
     except Exception as e:
         print(f"❌ CRITICAL ERROR in /users/: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -79,9 +220,9 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     return encoded_jwt
 
 @app.post("/token", response_model=schemas.Token)
-def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = crud.get_user_by_email(db, email=form_data.username)
-    if not user or not crud.verify_password(form_data.password, user.hashed_password):
+async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_db)):
+    user = await async_crud.get_user_by_email(db, email=form_data.username)
+    if not user or not await hashing.hasher.verify(form_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -96,13 +237,13 @@ def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db:
     access_token = create_access_token(
         data={"sub": user.email}, expires_delta=access_token_expires
     )
-    crud.update_last_login(db, user.id)
+    await async_crud.update_last_login(db, user.id)
     return {"access_token": access_token, "token_type": "bearer"}
 
 # --- User Me Endpoint ---
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -115,12 +256,22 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
             raise credentials_exception
     except Exception:
         raise credentials_exception
-    user = crud.get_user_by_email(db, email=email)
+    principal = auth_cache.principals.get(email)
+    if principal is not None:
+        return principal
+    since = auth_cache.principals.begin()
+    user = await async_crud.get_user_by_email(db, email=email)
     if user is None:
         raise credentials_exception
     if not user.is_active:
         raise credentials_exception
-    return user
+    # Cached as a detached snapshot; endpoints that modify the user reload it by id
+    principal = schemas.User.model_validate(user)
+    auth_cache.principals.put(email, principal, since)
+    # Give the connection back now instead of holding it for the rest of the request;
+    # the session checks out a new one lazily if the endpoint queries again
+    await db.close()
+    return principal
 
 @app.get("/users/me", response_model=schemas.User)
 async def read_users_me(current_user: schemas.User = Depends(get_current_user)):
@@ -147,64 +298,469 @@ def send_message(
     return crud.create_user_message(db=db, message=message, user_id=current_user.id)
 
 # --- Admin Endpoints ---
-@app.get("/admin/users", response_model=List[schemas.User])
+@app.get("/admin/users", response_model=schemas.UserPage)
 def read_users_admin(
-    skip: int = 0, 
-    limit: int = 100, 
+    role: Optional[str] = None,
+    is_active: Optional[bool] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=500),
     db: Session = Depends(get_db), 
     current_user: schemas.User = Depends(get_current_admin)
 ):
-    users = crud.get_users(db, skip=skip, limit=limit)
-    return users
+    """Users newest first, optionally filtered by role/is_active. Follow `next_cursor` for the next page."""
+    try:
+        after = pagination.decode_cursor(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    fast = fast_json.FAST_JSON_ENABLED
+    users, has_more = crud.get_users_page(db, role=role, is_active=is_active, after=after, limit=limit, project=fast)
+    next_cursor = pagination.encode_cursor(users[-1].created_at, users[-1].id) if has_more else None
+    if fast:
+        return fast_json.respond({"items": fast_json.as_dicts(schemas.User, users), "next_cursor": next_cursor})
+    return {"items": users, "next_cursor": next_cursor}
 
 @app.get("/admin/stats", response_model=schemas.AdminStats)
 def read_admin_stats(
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
     current_user: schemas.User = Depends(get_current_admin)
 ):
-    return crud.get_admin_stats(db)
-
-@app.get("/admin/messages", response_model=List[schemas.UserMessage])
+    uptime = admin_stats.uptime_seconds()
+    minute = int(uptime // 60)
+    # The ETag changes exactly when the body does: other counts or the next uptime minute.
+    # The snapshot is checked first, so a 304 is never older than ADMIN_STATS_TTL_SECONDS.
+    counts, generation = admin_stats.snapshot.get()
+    not_modified = etags.conditional(request, response, "admin_stats", generation, minute)
+    if not_modified:
+        return not_modified
+    return {**counts, "system_uptime": admin_stats.format_uptime(uptime)}
+
+@app.get("/admin/metrics")
+def read_admin_metrics(current_user: schemas.User = Depends(get_current_admin)):
+    """
+    Internal counters of the backend subsystems (ingestion buffer, ...).
+    """
+    return {
+        "ingestion": ingestion.buffer.stats(),
+        "ingest_filter": ingest_filter.gate.stats(),
+        "mqtt": mqtt.bridge.stats(),
+        "irrigation_timers": scheduler.timers.stats(),
+        "irrigation_rules": rules.engine.stats(),
+        "etags": etags.versions.stats(),
+        "zone_snapshot": zone_cache.snapshot.stats(),
+        "admin_stats": admin_stats.snapshot.stats(),
+        "archive": archive.last_export,
+        "live": live.hub.stats(),
+        "auth_cache": auth_cache.principals.stats(),
+        "password_hashing": hashing.hasher.stats(),
+        "db_pool": pool_stats(),
+    }
+
+@app.get("/metrics", include_in_schema=False)
+def read_metrics(authorization: Optional[str] = Header(None)):
+    """Prometheus scrape endpoint (see app/metrics.py)."""
+    if metrics.METRICS_TOKEN and authorization != f"Bearer {metrics.METRICS_TOKEN}":
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+def run_archive_export(before: datetime, since: Optional[datetime]):
+    db = SessionLocal()
+    try:
+        result = archive.export_readings(db, before=before, since=since)
+        print(f"Archive export finished: {result}")
+    except Exception as e:
+        print(f"ERROR: archive export failed: {e}")
+    finally:
+        db.close()
+
+@app.post("/admin/archive/export", status_code=202)
+def export_archive(
+    background_tasks: BackgroundTasks,
+    before: datetime,
+    since: Optional[datetime] = None,
+    current_user: schemas.User = Depends(get_current_admin)
+):
+    """
+    Streams readings older than `before` to Parquet in the background.
+    Both bounds are rounded down to midnight (the archive holds whole days).
+    Progress/result is reported under `archive` in GET /admin/metrics.
+    """
+    try:
+        archive.ensure_available()
+    except archive.ArchiveUnavailable as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    before, since = archive.day_bounds(before, since)
+    if since is not None and since >= before:
+        raise HTTPException(status_code=400, detail="'since' and 'before' must span at least one whole day")
+    background_tasks.add_task(run_archive_export, before, since)
+    return {"status": "started", "before": before, "since": since}
+
+@app.get("/admin/messages", response_model=schemas.UserMessagePage)
 def read_admin_messages(
-    skip: int = 0,
-    limit: int = 100,
+    unread_only: bool = False,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=500),
     db: Session = Depends(get_db),
     current_user: schemas.User = Depends(get_current_admin)
 ):
-    return crud.get_messages(db, skip=skip, limit=limit)
+    try:
+        after = pagination.decode_cursor(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    msgs, has_more = crud.get_messages_page(db, unread_only=unread_only, after=after, limit=limit)
+    next_cursor = pagination.encode_cursor(msgs[-1].created_at, msgs[-1].id) if has_more else None
+    return {"items": msgs, "next_cursor": next_cursor}
 
 @app.put("/admin/users/{user_id}", response_model=schemas.User)
-def update_user_admin(
+async def update_user_admin(
     user_id: int, 
     user_update: schemas.UserAdminUpdate, 
     db: Session = Depends(get_db), 
     current_user: schemas.User = Depends(get_current_admin)
 ):
-    db_user = crud.get_user(db, user_id=user_id)
+    hashed_password = await hashing.hasher.hash(user_update.password) if user_update.password else None
+    db_user = await run_in_threadpool(
+        crud.update_user_admin, db=db, user_id=user_id, user_update=user_update, hashed_password=hashed_password
+    )
     if db_user is None:
         raise HTTPException(status_code=404, detail="User not found")
-    return crud.update_user_admin(db=db, db_user=db_user, user_update=user_update)
+    return db_user
 
 # Protected Sensor Ingestion
-@app.post("/sensors/data", response_model=schemas.SensorReading, dependencies=[Depends(verify_sensor_token)])
-def create_sensor_reading(reading: schemas.SensorReadingCreate, db: Session = Depends(get_db)):
+@app.post(
+    "/sensors/data",
+    response_model=schemas.SensorReading,
+    responses={
+        202: {"description": "Reading queued in the write-behind buffer"},
+        200: {"description": "Stored, or acknowledged without storing (retransmission / inside the deadband)"},
+    },
+    dependencies=[Depends(verify_sensor_token)]
+)
+async def create_sensor_reading(reading: schemas.SensorReadingCreate, db: AsyncSession = Depends(get_async_db)):
     """
     Endpoint protected by API Token. Only authorized sensors can post data.
+    With the write-behind buffer enabled the reading is queued and 202 is returned.
+    Duplicates and readings inside the deadband are acknowledged with {"status": "skipped"} but not stored.
+    """
+    skipped = ingest_filter.gate.admit(reading)
+    if skipped:
+        return JSONResponse(content={"status": "skipped", "reason": skipped})
+    # The buffer may also be running just for MQTT: HTTP only queues when it was enabled for HTTP
+    if ingestion.INGEST_BUFFER_ENABLED and ingestion.buffer.running:
+        try:
+            ingestion.buffer.enqueue(reading)
+        except ingestion.IngestionBufferFull:
+            ingest_filter.gate.discard(reading)
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Ingestion buffer full, retry later",
+                headers={"Retry-After": "1"},
+            )
+        return JSONResponse(status_code=status.HTTP_202_ACCEPTED, content={"status": "queued"})
+    try:
+        return await async_crud.create_sensor_reading(db=db, reading=reading)
+    except Exception:
+        ingest_filter.gate.discard(reading) # Let the device's retry through
+        raise
+
+# Bulk Sensor Ingestion
+import json
+
+SENSOR_BATCH_MAX_ITEMS = int(os.getenv("SENSOR_BATCH_MAX_ITEMS", "5000"))
+
+def parse_sensor_batch(body: bytes, content_type: str):
+    """
+    Parses a JSON array or an NDJSON body (one reading per line).
+    Returns (valid_readings, rejections); malformed items never fail the whole batch.
+    """
+    if "ndjson" in content_type:
+        items = []
+        for line in body.splitlines():
+            if not line.strip():
+                continue
+            try:
+                items.append(json.loads(line))
+            except ValueError:
+                items.append(None) # Reported as rejected below
+    else:
+        try:
+            items = json.loads(body)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON")
+        if not isinstance(items, list):
+            raise HTTPException(status_code=400, detail="Body must be a JSON array of readings")
+
+    if len(items) > SENSOR_BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"Batch exceeds {SENSOR_BATCH_MAX_ITEMS} readings")
+
+    valid = []
+    rejections = []
+    for index, item in enumerate(items):
+        if item is None:
+            rejections.append(schemas.SensorBatchRejection(index=index, error="Invalid JSON"))
+            continue
+        try:
+            valid.append(schemas.SensorReadingCreate.model_validate(item))
+        except ValidationError as e:
+            error = "; ".join(f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors())
+            rejections.append(schemas.SensorBatchRejection(index=index, error=error))
+    return valid, rejections
+
+@app.post("/sensors/data/batch", response_model=schemas.SensorBatchResult, dependencies=[Depends(verify_sensor_token)])
+async def create_sensor_readings_batch(request: Request, db: AsyncSession = Depends(get_async_db)):
     """
-    return crud.create_sensor_reading(db=db, reading=reading)
+    Bulk ingestion for sensor gateways. Accepts a JSON array of readings or
+    NDJSON (Content-Type: application/x-ndjson). Valid readings are written in
+    a single transaction; invalid ones are reported by index. Duplicates and
+    readings inside the deadband are counted as skipped.
+    """
+    body = await request.body()
+    valid, rejections = parse_sensor_batch(body, request.headers.get("content-type", ""))
+    admitted = [reading for reading in valid if ingest_filter.gate.admit(reading) is None]
+    try:
+        accepted = await async_crud.create_sensor_readings_bulk(db, admitted)
+    except Exception:
+        for reading in admitted:
+            ingest_filter.gate.discard(reading)
+        raise
+    return schemas.SensorBatchResult(
+        accepted=accepted, rejected=len(rejections), skipped=len(valid) - len(admitted), errors=rejections
+    )
 
 # Dashboard Stats (Averages)
 @app.get("/dashboard/stats", response_model=schemas.DashboardStats)
-def get_dashboard_stats(db: Session = Depends(get_db)):
+async def get_dashboard_stats(request: Request, response: Response, db: AsyncSession = Depends(get_async_db)):
     """
     Returns aggregated data for the dashboard (Averages, Totals).
+    Unchanged since the client's If-None-Match: 304 without querying the database.
     """
-    return crud.get_dashboard_stats(db)
+    not_modified = etags.conditional(request, response, "dashboard_stats", etags.versions.get("readings"))
+    if not_modified:
+        return not_modified
+    return await async_crud.get_dashboard_stats(db)
 
 # Sensor History
-@app.get("/sensors/history", response_model=List[schemas.SensorReading])
-def get_sensor_history(limit: int = 100, db: Session = Depends(get_db)):
-    return crud.get_recent_readings(db, limit=limit)
+HISTORY_DEFAULT_WINDOW = timedelta(hours=24)
+
+def pick_history_resolution(start: datetime, end: datetime, max_points: int) -> str:
+    """
+    Finest rollup whose bucket count over [start, end) fits the point budget
+    (falls back to daily buckets for very long ranges).
+    """
+    span = (end - start).total_seconds()
+    for resolution, seconds in crud.ROLLUP_RESOLUTIONS.items():
+        if span / seconds <= max_points:
+            return resolution
+    return "1d"
+
+def read_raw_history(db: Session, sensor_id: str, start: datetime, end: datetime, limit: int):
+    """
+    Raw readings in [start, end). The part older than the oldest row still in
+    Postgres is read back from the Parquet archive, the rest from the database.
+    """
+    rows = []
+    if archive.has_archive(sensor_id):
+        hot_start = crud.get_oldest_reading_time(db, sensor_id)
+        archive_end = min(end, hot_start) if hot_start else end
+        if start < archive_end:
+            try:
+                for row in archive.read_archived(sensor_id, start, archive_end):
+                    rows.append(row)
+                    if len(rows) >= limit:
+                        return rows
+            except archive.ArchiveUnavailable:
+                pass
+            start = archive_end
+    if start < end:
+        for r in crud.get_sensor_readings_range(db, sensor_id, start, end, limit=limit - len(rows)):
+            rows.append({"timestamp": r.timestamp, "temperature": r.temperature, "humidity": r.humidity})
+    return rows
+
+@app.get("/sensors/history", response_model=Union[schemas.SensorHistory, List[schemas.SensorReading]])
+def get_sensor_history(
+    request: Request,
+    response: Response,
+    limit: int = 100,
+    sensor_id: Optional[str] = None,
+    start: Optional[datetime] = Query(None, alias="from"),
+    end: Optional[datetime] = Query(None, alias="to"),
+    resolution: str = "auto",
+    max_points: int = Query(500, ge=1, le=10000),
+    db: Session = Depends(get_db)
+):
+    """
+    Without `sensor_id`: the last `limit` raw readings (legacy behaviour).
+    With `sensor_id`: a downsampled series over [from, to) (default: last 24 h).
+    `resolution` is 'raw', '1m', '1h', '1d' or 'auto' (coarsest rollup needed to
+    stay within `max_points`).
+    Supports If-None-Match (304 while no reading of the sensor was written).
+    """
+    if sensor_id is None:
+        not_modified = etags.conditional(request, response, "sensor_history", etags.versions.get("readings"), limit)
+        if not_modified:
+            return not_modified
+        if fast_json.FAST_JSON_ENABLED:
+            rows = crud.get_recent_readings(db, limit=limit, project=True)
+            return fast_json.respond(fast_json.as_dicts(schemas.SensorReading, rows), response)
+        return crud.get_recent_readings(db, limit=limit)
+
+    # An open-ended window slides with the clock, so its ETag also changes every minute
+    window = (start, end) if end is not None else (start, int(time.time() // 60))
+    not_modified = etags.conditional(
+        request, response, "sensor_history",
+        etags.versions.get("readings:" + sensor_id), etags.versions.get("readings_retention"),
+        sensor_id, window, resolution, max_points
+    )
+    if not_modified:
+        return not_modified
+
+    if resolution != "auto" and resolution != "raw" and resolution not in crud.ROLLUP_RESOLUTIONS:
+        raise HTTPException(status_code=400, detail="resolution must be auto, raw, 1m, 1h or 1d")
+    end = end or datetime.utcnow()
+    start = start or end - HISTORY_DEFAULT_WINDOW
+    if start >= end:
+        raise HTTPException(status_code=400, detail="'from' must be earlier than 'to'")
+    if resolution == "auto":
+        resolution = pick_history_resolution(start, end, max_points)
+
+    if resolution == "raw":
+        readings = read_raw_history(db, sensor_id, start, end, max_points)
+        points = [
+            {
+                "bucket": r["timestamp"], "count": 1,
+                "temperature_avg": r["temperature"], "temperature_min": r["temperature"], "temperature_max": r["temperature"],
+                "humidity_avg": r["humidity"], "humidity_min": r["humidity"], "humidity_max": r["humidity"],
+            }
+            for r in readings
+        ]
+    else:
+        points = crud.get_sensor_rollups(db, sensor_id, resolution, start, end)
+    return schemas.SensorHistory(sensor_id=sensor_id, resolution=resolution, start=start, end=end, points=points)
+
+# Sensor Readings (keyset pagination)
+@app.get("/sensors/readings", response_model=schemas.SensorReadingPage)
+def get_sensor_readings(
+    sensor_id: Optional[str] = None,
+    start: Optional[datetime] = Query(None, alias="from"),
+    end: Optional[datetime] = Query(None, alias="to"),
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_db),
+    current_user: schemas.User = Depends(get_current_user)
+):
+    """
+    Raw readings newest first, optionally for one sensor and a [from, to) range.
+    Follow `next_cursor` to page back in time; each page costs the same.
+    """
+    try:
+        after = pagination.decode_cursor(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    fast = fast_json.FAST_JSON_ENABLED
+    rows, has_more = crud.get_sensor_readings_page(
+        db, sensor_id=sensor_id, start=start, end=end, after=after, limit=limit, project=fast
+    )
+    next_cursor = pagination.encode_cursor(rows[-1].timestamp, rows[-1].id) if has_more else None
+    if fast:
+        return fast_json.respond({"items": fast_json.as_dicts(schemas.SensorReading, rows), "next_cursor": next_cursor})
+    return {"items": rows, "next_cursor": next_cursor}
+
+# Sensor Readings export (streamed)
+@app.get("/sensors/export")
+def export_sensor_readings(
+    request: Request,
+    format: str = "csv",
+    sensor_id: Optional[str] = None,
+    start: Optional[datetime] = Query(None, alias="from"),
+    end: Optional[datetime] = Query(None, alias="to"),
+    current_user: schemas.User = Depends(get_current_user)
+):
+    """
+    Raw readings oldest first as CSV or NDJSON, optionally for one sensor and a
+    [from, to) range. Streamed in constant memory, gzip-compressed when the
+    client sends Accept-Encoding: gzip. Requires a logged-in user.
+    """
+    if format not in export.FORMATS:
+        raise HTTPException(status_code=400, detail="format must be csv or ndjson")
+    if start is not None and end is not None and start >= end:
+        raise HTTPException(status_code=400, detail="'from' must be earlier than 'to'")
+    gzip = "gzip" in request.headers.get("accept-encoding", "").lower()
+    headers = {
+        "Content-Disposition": f'attachment; filename="sensor_readings.{format}"',
+        "Vary": "Accept-Encoding",
+    }
+    if gzip:
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(
+        export.stream_readings(format, sensor_id=sensor_id, start=start, end=end, gzip=gzip),
+        media_type=export.FORMATS[format],
+        headers=headers,
+    )
+
+# Live Updates (Server-Sent Events)
+
+LIVE_KEEPALIVE_SECONDS = 15
+
+def parse_id_list(value: Optional[str]):
+    if not value:
+        return None
+    return {item.strip() for item in value.split(",") if item.strip()}
+
+# EventSource cannot send an Authorization header: streams also take the token as ?access_token=
+oauth2_scheme_optional = OAuth2PasswordBearer(tokenUrl="token", auto_error=False)
+
+async def get_current_user_for_stream(
+    token: Optional[str] = Depends(oauth2_scheme_optional),
+    access_token: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    return await get_current_user(token or access_token or "", db)
+
+@app.get("/events")
+async def live_events(
+    request: Request,
+    topics: str = "readings,zones",
+    sensors: Optional[str] = None,
+    zones: Optional[str] = None,
+    current_user: schemas.User = Depends(get_current_user_for_stream)
+):
+    """
+    Server-Sent Events stream with new sensor readings (`event: reading`) and
+    irrigation zone changes (`event: zone`). `sensors` / `zones` are optional
+    comma-separated ID filters. Replaces polling /irrigation/zones.
+    Authenticated with the bearer token, in the header or as `access_token`.
+    """
+    topic_set = parse_id_list(topics) or {"readings", "zones"}
+    try:
+        zone_ids = {int(z) for z in parse_id_list(zones)} if zones else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="zones must be a comma-separated list of IDs")
+    subscriber = live.hub.subscribe(topic_set, sensors=parse_id_list(sensors), zones=zone_ids)
+
+    async def stream():
+        try:
+            yield ": connected\n\n"
+            while True:
+                try:
+                    message = await asyncio.wait_for(subscriber.queue.get(), timeout=LIVE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": keepalive\n\n"
+                    continue
+                if message is live.DROPPED:
+                    # Too slow: tell the client to reconnect and resync
+                    yield "event: dropped\ndata: {}\n\n"
+                    break
+                yield message
+        finally:
+            live.hub.unsubscribe(subscriber)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 # --- Profile Management ---
 from fastapi import File, UploadFile
@@ -219,15 +775,19 @@ app.mount("/static", StaticFiles(directory="static"), name="static")
 async def update_user_me(
     user_update: schemas.UserUpdate, 
     current_user: schemas.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    return crud.update_user(db, current_user, user_update)
+    hashed_password = await hashing.hasher.hash(user_update.password) if user_update.password else None
+    db_user = await async_crud.update_user(db, current_user.id, user_update, hashed_password)
+    if db_user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return db_user
 
 @app.post("/users/me/avatar")
 async def upload_avatar(
     file: UploadFile = File(...),
     current_user: schemas.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     # Validate file type
     if not file.content_type.startswith("image/"):
@@ -238,24 +798,24 @@ async def upload_avatar(
     filename = f"{uuid.uuid4()}.{file_extension}"
     file_location = f"static/images/{filename}"
     
-    # Save file
-    with open(file_location, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+    # Save file (blocking disk I/O, off the event loop)
+    def save_upload():
+        with open(file_location, "wb") as buffer:
+            shutil.copyfileobj(file.file, buffer)
+    await run_in_threadpool(save_upload)
         
     # Update user profile_image_url
     # Construct URL (Assuming local dev, in prod use full domain or CDN)
     image_url = f"/static/images/{filename}"
     
-    current_user.profile_image_url = image_url
-    db.commit()
-    db.refresh(current_user)
+    await async_crud.set_profile_image(db, current_user.id, image_url)
     
     return {"info": "Image uploaded successfully", "url": image_url}
 
 @app.delete("/users/me/avatar", status_code=204)
 async def delete_avatar(
     current_user: schemas.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     if not current_user.profile_image_url:
         return None
@@ -265,9 +825,7 @@ async def delete_avatar(
     # if os.path.exists(filepath):
     #     os.remove(filepath)
 
-    current_user.profile_image_url = None
-    db.commit()
-    db.refresh(current_user)
+    await async_crud.set_profile_image(db, current_user.id, None)
     return None
 
 @app.delete("/admin/users/{user_id}", status_code=204)
@@ -276,23 +834,22 @@ def delete_user_admin(
     db: Session = Depends(get_db), 
     current_user: schemas.User = Depends(get_current_admin)
 ):
-    db_user = crud.get_user(db, user_id=user_id)
-    if db_user is None:
+    if crud.delete_user(db, user_id=user_id) is None:
         raise HTTPException(status_code=404, detail="User not found")
-    crud.delete_user(db, user_id=user_id)
     return None
 
 # --- Irrigation Endpoints ---
 @app.get("/irrigation/zones", response_model=List[schemas.IrrigationZone])
-def read_irrigation_zones(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    zones = crud.get_irrigation_zones(db, skip=skip, limit=limit)
-    # Init default zones if empty (First run logic)
-    if not zones:
-        defaults = ["Sector Norte", "Sector Sur", "Invernadero", "Jardín Principal"]
-        for name in defaults:
-            crud.create_irrigation_zone(db, schemas.IrrigationZoneCreate(name=name))
-        zones = crud.get_irrigation_zones(db, skip=skip, limit=limit)
-    return zones
+def read_irrigation_zones(request: Request, response: Response, skip: int = Query(0, ge=0), limit: int = Query(100, ge=1)):
+    """
+    Pure read served from the in-memory zone snapshot (app/zone_cache.py); default
+    zones are created by the seed migration, not here.
+    """
+    # timer_seconds_remaining is not part of the ETag: clients count down from timer_ends_at
+    not_modified = etags.conditional(request, response, "zones", etags.versions.get("zones"), skip, limit)
+    if not_modified:
+        return not_modified
+    return zone_cache.snapshot.get()[skip:skip + limit]
 
 @app.put("/irrigation/zones/{zone_id}", response_model=schemas.IrrigationZone)
 def update_irrigation_zone(
@@ -300,54 +857,93 @@ def update_irrigation_zone(
     zone_update: schemas.IrrigationZoneUpdate, 
     db: Session = Depends(get_db)
 ):
-    db_zone = crud.get_irrigation_zone(db, zone_id=zone_id)
+    db_zone = crud.update_irrigation_zone(db, zone_id, zone_update)
     if db_zone is None:
         raise HTTPException(status_code=404, detail="Zone not found")
-    return crud.update_irrigation_zone(db, db_zone, zone_update)
+    return db_zone
 
 @app.post("/irrigation/zones/{zone_id}/toggle", response_model=schemas.IrrigationZone)
 def toggle_irrigation_pump(
     zone_id: int, 
     db: Session = Depends(get_db)
 ):
-    db_zone = crud.get_irrigation_zone(db, zone_id=zone_id)
+    # Toggle logic (turning ON sets mode to manual) runs in a single UPDATE
+    db_zone = crud.toggle_irrigation_pump(db, zone_id)
     if db_zone is None:
         raise HTTPException(status_code=404, detail="Zone not found")
     
-    # Toggle logic
-    new_state = not db_zone.is_pump_active
+    mqtt.bridge.send_command(zone_id, "on" if db_zone.is_pump_active else "off")
     
-    # If turning ON, set mode to manual
-    update_data = schemas.IrrigationZoneUpdate(
-        is_pump_active=new_state,
-        mode="manual" if new_state else db_zone.mode
-    )
-    
-    # TODO: Here we would send MQTT/Serial command to ESP32
-    print(f"COMMAND: Pump {zone_id} {'ON' if new_state else 'OFF'}")
-    
-    return crud.update_irrigation_zone(db, db_zone, update_data)
+    return db_zone
 
 @app.post("/irrigation/zones/{zone_id}/timer", response_model=schemas.IrrigationZone)
 def set_irrigation_timer(
     zone_id: int, 
-    seconds: int,
+    seconds: int = Query(..., gt=0, le=86400),
     db: Session = Depends(get_db)
 ):
     """
     Sets the pump ON and configures the timer.
+    The server switches the pump off when it expires (app/scheduler.py).
     """
-    db_zone = crud.get_irrigation_zone(db, zone_id=zone_id)
-    if db_zone is None:
-        raise HTTPException(status_code=404, detail="Zone not found")
-    
     update_data = schemas.IrrigationZoneUpdate(
         is_pump_active=True,
         mode="timer",
         timer_seconds_remaining=seconds
     )
+    db_zone = crud.update_irrigation_zone(db, zone_id, update_data)
+    if db_zone is None:
+        raise HTTPException(status_code=404, detail="Zone not found")
     
-    # TODO: Send 'TIMER: {seconds}' command to ESP32
-    print(f"COMMAND: Set Timer {zone_id} for {seconds}s")
+    mqtt.bridge.send_command(zone_id, "timer", seconds=seconds)
     
-    return crud.update_irrigation_zone(db, db_zone, update_data)
+    return db_zone
+
+# --- Irrigation Rules ('auto' mode) ---
+@app.get("/irrigation/rules", response_model=List[schemas.IrrigationRule])
+def read_irrigation_rules(
+    zone_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+    current_user: schemas.User = Depends(get_current_user)
+):
+    return crud.get_irrigation_rules(db, zone_id=zone_id)
+
+@app.post("/irrigation/rules", response_model=schemas.IrrigationRule, status_code=201)
+def create_irrigation_rule(
+    rule: schemas.IrrigationRuleCreate,
+    db: Session = Depends(get_db),
+    current_user: schemas.User = Depends(get_current_user)
+):
+    """
+    Waters the rule's zone while the sensor's humidity is below min_humidity,
+    until it reaches max_humidity. Only zones in mode 'auto' are driven by rules.
+    """
+    if crud.get_irrigation_zone(db, zone_id=rule.zone_id) is None:
+        raise HTTPException(status_code=404, detail="Zone not found")
+    return crud.create_irrigation_rule(db, rule)
+
+@app.put("/irrigation/rules/{rule_id}", response_model=schemas.IrrigationRule)
+def update_irrigation_rule(
+    rule_id: int,
+    rule_update: schemas.IrrigationRuleUpdate,
+    db: Session = Depends(get_db),
+    current_user: schemas.User = Depends(get_current_user)
+):
+    db_rule = crud.get_irrigation_rule(db, rule_id)
+    if db_rule is None:
+        raise HTTPException(status_code=404, detail="Rule not found")
+    values = rule_update.model_dump(exclude_unset=True)
+    # The merged rule must still have a valid hysteresis band
+    if values.get("max_humidity", db_rule.max_humidity) <= values.get("min_humidity", db_rule.min_humidity):
+        raise HTTPException(status_code=422, detail="max_humidity must be greater than min_humidity")
+    return crud.update_irrigation_rule(db, rule_id, values)
+
+@app.delete("/irrigation/rules/{rule_id}", status_code=204)
+def delete_irrigation_rule(
+    rule_id: int,
+    db: Session = Depends(get_db),
+    current_user: schemas.User = Depends(get_current_user)
+):
+    if crud.delete_irrigation_rule(db, rule_id) is None:
+        raise HTTPException(status_code=404, detail="Rule not found")
+    return None
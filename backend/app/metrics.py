@@ -0,0 +1,284 @@
+"""
+Prometheus metrics, served as text at GET /metrics.
+
+- Requests: count and latency histogram per method, route template and status
+  (MetricsMiddleware, plain ASGI so it adds no extra task per request). The
+  latency is the time until the response headers are sent, so long-lived
+  streams (/events, /sensors/export) do not distort it.
+- Database: every statement on both engines is counted and timed
+  (cursor execute events); per request, the number of statements and the time
+  spent in them go into their own histograms. Connection pool gauges come
+  from database.pool_stats().
+- Ingestion: committed readings per sensor_id (crud.readings_committed).
+- bcrypt: time of hash/verify operations (app/hashing.py).
+
+No client library: counters and fixed-bucket histograms live in this module
+and are rendered in the text exposition format on scrape, so the cost on the
+request path is a few additions under a lock. Values are per process (each
+uvicorn worker is a separate scrape target). METRICS_ENABLED=false turns
+the middleware and the SQL hooks off; METRICS_TOKEN, when set, is required
+as a bearer token on /metrics.
+"""
+import bisect
+import contextvars
+import os
+import threading
+import time
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+
+from .database import async_engine, engine, pool_stats
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DB_SECONDS_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0, 5.0)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+BCRYPT_BUCKETS = (0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 2.0, 5.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._values: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def inc_many(self, amounts: Dict[Tuple, float]):
+        with self._lock:
+            for labels, amount in amounts.items():
+                self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = dict(self._values)
+        for labels, value in sorted(values.items()):
+            lines.append(f"{self.name}{_labels(self.label_names, labels)} {_number(value)}")
+        return "\n".join(lines)
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, buckets: Sequence[float], labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self.label_names = tuple(labels)
+        self._series: Dict[Tuple, list] = {} # labels -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = {labels: list(series) for labels, series in self._series.items()}
+        for labels, series in sorted(snapshot.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series):
+                cumulative += count
+                le = 'le="' + _number(float(bound)) + '"'
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, labels)} {_number(series[-1])}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, labels)} {cumulative}")
+        return "\n".join(lines)
+
+
+class Collected:
+    """Values read from a callable at scrape time: collect() -> {labels tuple: value}."""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str], collect: Callable[[], Dict[Tuple, float]], kind: str = "gauge"):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self.collect = collect
+        self.kind = kind
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for labels, value in sorted(self.collect().items()):
+            lines.append(f"{self.name}{_labels(self.label_names, labels)} {_number(value)}")
+        return "\n".join(lines)
+
+
+# --- Metrics ---
+http_requests = Counter("http_requests_total", "HTTP requests by route template and status.", ("method", "route", "status"))
+http_latency = Histogram(
+    "http_request_duration_seconds", "Time until the response headers were sent.", LATENCY_BUCKETS, ("method", "route")
+)
+http_db_statements = Histogram(
+    "http_request_db_statements", "SQL statements run while serving a request.", STATEMENT_BUCKETS, ("route",)
+)
+http_db_seconds = Histogram(
+    "http_request_db_seconds", "Time spent in SQL statements while serving a request.", DB_SECONDS_BUCKETS, ("route",)
+)
+db_statements = Counter("db_statements_total", "SQL statements sent, per engine.", ("engine",))
+db_statement_seconds = Histogram(
+    "db_statement_duration_seconds", "Duration of single SQL statements, per engine.", DB_SECONDS_BUCKETS, ("engine",)
+)
+sensor_readings = Counter("sensor_readings_ingested_total", "Readings committed to the database, per sensor.", ("sensor_id",))
+password_hash_seconds = Histogram(
+    "password_hash_duration_seconds", "bcrypt time of password hash/verify operations (queue wait excluded).",
+    BCRYPT_BUCKETS, ("op",)
+)
+
+
+def record_readings(rows):
+    """Called by crud.readings_committed; one lock acquisition per batch."""
+    counts: Dict[Tuple, int] = {}
+    for row in rows:
+        key = (row["sensor_id"],)
+        counts[key] = counts.get(key, 0) + 1
+    sensor_readings.inc_many(counts)
+
+
+def _pool_values(key: str) -> Callable[[], Dict[Tuple, float]]:
+    return lambda: {(name,): stats[key] for name, stats in pool_stats().items()}
+
+
+_registry = [
+    http_requests,
+    http_latency,
+    http_db_statements,
+    http_db_seconds,
+    db_statements,
+    db_statement_seconds,
+    Collected("db_pool_size", "Configured connection pool size.", ("pool",), _pool_values("size")),
+    Collected("db_pool_checked_out", "Connections currently in use.", ("pool",), _pool_values("checked_out")),
+    Collected("db_pool_overflow", "Connections open beyond the pool size.", ("pool",), _pool_values("overflow")),
+    Collected("db_pool_checkouts_total", "Connection checkouts.", ("pool",), _pool_values("checkouts"), "counter"),
+    Collected("db_pool_timeouts_total", "Checkouts that timed out waiting for a connection.", ("pool",), _pool_values("timeouts"), "counter"),
+    Collected("db_pool_max_wait_seconds", "Longest wait for a connection since start.", ("pool",), _pool_values("max_wait_seconds")),
+    sensor_readings,
+    password_hash_seconds,
+]
+
+
+def render() -> str:
+    return "\n".join(metric.render() for metric in _registry) + "\n"
+
+
+# --- SQL hooks ---
+class _RequestDb:
+    __slots__ = ("statements", "seconds")
+
+    def __init__(self):
+        self.statements = 0
+        self.seconds = 0.0
+
+
+# Set by the middleware; sync endpoints run in a copy of the request context, so they see it too
+_request_db: contextvars.ContextVar[Optional[_RequestDb]] = contextvars.ContextVar("request_db", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info["metrics_started"] = time.perf_counter()
+
+
+def _after_cursor_execute(engine_name: str):
+    def after(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.pop("metrics_started", None)
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+        db_statements.inc(engine_name)
+        db_statement_seconds.observe(elapsed, engine_name)
+        current = _request_db.get()
+        if current is not None:
+            current.statements += 1
+            current.seconds += elapsed
+    return after
+
+
+_installed = False
+
+
+def install_sql_hooks():
+    global _installed
+    if _installed or not METRICS_ENABLED:
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute("sync"))
+    event.listen(async_engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(async_engine.sync_engine, "after_cursor_execute", _after_cursor_execute("async"))
+    _installed = True
+
+
+# --- Middleware ---
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+        self._routes: Optional[Dict] = None # endpoint -> route template, built on first request
+
+    def _route_template(self, scope) -> str:
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "unmatched" # 404s: never the raw path, it would explode the label set
+        if self._routes is None:
+            routes = {}
+            for route in scope["app"].routes:
+                routes[getattr(route, "endpoint", None) or getattr(route, "app", None)] = route.path
+            self._routes = routes
+        return self._routes.get(endpoint, "unmatched")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        db = _RequestDb()
+        token = _request_db.set(db)
+        status = 500
+        latency = None
+
+        async def send_wrapper(message):
+            nonlocal status, latency
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                latency = time.perf_counter() - started
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_db.reset(token)
+            route = self._route_template(scope)
+            method = scope["method"]
+            http_requests.inc(method, route, str(status))
+            http_latency.observe(latency if latency is not None else time.perf_counter() - started, method, route)
+            http_db_statements.observe(db.statements, route)
+            http_db_seconds.observe(db.seconds, route)
@@ -1,11 +1,10 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, BigInteger, String, Float, DateTime, Boolean, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from .database import Base
 
 class User(Base):
     __tablename__ = "users"
-    __table_args__ = {"schema": "dev"}
 
     id = Column(Integer, primary_key=True, index=True)
     full_name = Column(String, index=True)
@@ -17,9 +16,14 @@ class User(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     last_login = Column(DateTime, nullable=True) # Track user activity
 
+    __table_args__ = (
+        # Keyset pagination of the admin user list, newest first
+        Index("ix_dev_users_created_at_id", created_at.desc(), id.desc()),
+        {"schema": "dev"},
+    )
+
 class UserMessage(Base):
     __tablename__ = "user_messages"
-    __table_args__ = {"schema": "dev"}
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("dev.users.id"))
@@ -30,23 +34,95 @@ class UserMessage(Base):
 
     user = relationship("User", backref="messages")
 
+    __table_args__ = (
+        # Keyset pagination of the admin inbox, and its "unread only" view
+        Index("ix_dev_user_messages_created_at_id", created_at.desc(), id.desc()),
+        Index("ix_dev_user_messages_unread_created_at_id", created_at.desc(), id.desc(), postgresql_where=~is_read),
+        {"schema": "dev"},
+    )
+
 class SensorReading(Base):
     __tablename__ = "sensor_readings"
-    __table_args__ = {"schema": "dev"}
 
-    id = Column(Integer, primary_key=True, index=True)
-    sensor_id = Column(String, index=True) # e.g., "ESP32-001"
+    # Range-partitioned by timestamp (see app/partitions.py), so it is part of the primary key
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    sensor_id = Column(String) # e.g., "ESP32-001"
     temperature = Column(Float)
     humidity = Column(Float)
-    timestamp = Column(DateTime, default=datetime.utcnow)
+    timestamp = Column(DateTime, primary_key=True, default=datetime.utcnow)
+
+    __table_args__ = (
+        # Per-sensor range scans and "latest N of a sensor" (also serves plain sensor_id lookups)
+        Index("ix_dev_sensor_readings_sensor_id_timestamp", sensor_id, timestamp.desc()),
+        # Tiny index for time-range filters on the append-only table
+        Index("ix_dev_sensor_readings_timestamp_brin", timestamp, postgresql_using="brin"),
+        # Newest readings of all sensors (no sensor_id predicate): ORDER BY timestamp DESC, id DESC LIMIT n
+        Index("ix_dev_sensor_readings_timestamp_id", timestamp.desc(), id.desc()),
+        {"schema": "dev"},
+    )
+
+class SensorSummary(Base):
+    """
+    Running aggregates per sensor, updated in the same transaction as each insert
+    into sensor_readings so /dashboard/stats never scans the raw table.
+    Recompute with `python rebuild_stats.py` if it ever drifts.
+    """
+    __tablename__ = "sensor_summaries"
+    __table_args__ = {"schema": "dev"}
+
+    sensor_id = Column(String, primary_key=True)
+    reading_count = Column(BigInteger, default=0, nullable=False)
+    temperature_sum = Column(Float, default=0.0, nullable=False)
+    humidity_sum = Column(Float, default=0.0, nullable=False)
+    first_seen = Column(DateTime, nullable=True)
+    last_seen = Column(DateTime, nullable=True)
+
+class SensorRollup(Base):
+    """
+    Time-bucketed aggregates per sensor ('1m', '1h' and '1d' buckets), fed on ingest.
+    Backs the downsampled /sensors/history so charts never pull raw rows.
+    """
+    __tablename__ = "sensor_rollups"
+    __table_args__ = {"schema": "dev"}
+
+    sensor_id = Column(String, primary_key=True)
+    resolution = Column(String, primary_key=True) # '1m', '1h' or '1d'
+    bucket = Column(DateTime, primary_key=True) # Bucket start (UTC)
+    reading_count = Column(BigInteger, default=0, nullable=False)
+    temperature_sum = Column(Float, default=0.0, nullable=False)
+    temperature_min = Column(Float, nullable=True)
+    temperature_max = Column(Float, nullable=True)
+    humidity_sum = Column(Float, default=0.0, nullable=False)
+    humidity_min = Column(Float, nullable=True)
+    humidity_max = Column(Float, nullable=True)
 
 class IrrigationZone(Base):
     __tablename__ = "irrigation_zones"
-    __table_args__ = {"schema": "dev"}
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, index=True) # User editable name (e.g., "Sector Norte")
     is_pump_active = Column(Boolean, default=False)
-    mode = Column(String, default="manual") # 'manual' or 'timer'
+    mode = Column(String, default="manual") # 'manual', 'timer' or 'auto' (driven by irrigation_rules)
     last_watered = Column(DateTime, nullable=True)
-    timer_seconds_remaining = Column(Integer, default=0) # For tracking active timers
+    timer_seconds_remaining = Column(Integer, default=0) # Duration of the last timer that was set
+    timer_ends_at = Column(DateTime, nullable=True) # UTC deadline of the running timer (NULL = none)
+
+    __table_args__ = (
+        # Only running timers are indexed: restoring them at startup reads just these rows
+        Index("ix_dev_irrigation_zones_timer_ends_at", timer_ends_at, postgresql_where=timer_ends_at.isnot(None)),
+        {"schema": "dev"},
+    )
+
+class IrrigationRule(Base):
+    """Hysteresis rule of an 'auto' zone: water while a sensor's humidity is low."""
+    __tablename__ = "irrigation_rules"
+    __table_args__ = {"schema": "dev"}
+
+    id = Column(Integer, primary_key=True, index=True)
+    zone_id = Column(Integer, ForeignKey("dev.irrigation_zones.id", ondelete="CASCADE"), index=True)
+    sensor_id = Column(String, nullable=False)
+    min_humidity = Column(Float, nullable=False) # Pump ON when humidity drops below this
+    max_humidity = Column(Float, nullable=False) # Pump OFF once humidity reaches this
+    enabled = Column(Boolean, default=True)
+    demand = Column(Boolean, nullable=False, default=False, server_default="false") # Hysteresis state, shared by all workers
+    created_at = Column(DateTime, default=datetime.utcnow)
@@ -0,0 +1,297 @@
+"""
+MQTT bridge: sensor readings in, irrigation commands and zone state out.
+
+- Readings: devices publish to `sensors/<sensor_id>/readings` (a JSON object
+  or a list of them, same fields as POST /sensors/data without sensor_id).
+  They go through ingest_filter and into the write-behind ingestion buffer,
+  so MQTT and HTTP share one batched write path.
+- Commands: pump/timer actions are published to
+  `irrigation/zones/<zone_id>/command` with MQTT_COMMAND_QOS.
+- State: every committed zone change is published retained to
+  `irrigation/zones/<zone_id>/state`, so a device that (re)connects gets the
+  current desired state straight from the broker.
+
+MQTT_BROKER_URL selects the transport: mqtt://host:1883 or mqtts://host:8883
+through paho-mqtt, or memory:// for the in-process broker (`local_broker`),
+which is enough for tests and single-process setups.
+"""
+import json
+import os
+import threading
+from typing import Callable, List, Optional
+from urllib.parse import urlparse
+
+from pydantic import ValidationError
+
+from . import ingest_filter, schemas
+
+MQTT_ENABLED = os.getenv("MQTT_ENABLED", "false").lower() in ("1", "true", "yes")
+MQTT_BROKER_URL = os.getenv("MQTT_BROKER_URL", "mqtt://localhost:1883")
+MQTT_CLIENT_ID = os.getenv("MQTT_CLIENT_ID", "uleam-iot-backend")
+MQTT_USERNAME = os.getenv("MQTT_USERNAME")
+MQTT_PASSWORD = os.getenv("MQTT_PASSWORD")
+MQTT_READINGS_TOPIC = os.getenv("MQTT_READINGS_TOPIC", "sensors/+/readings")
+MQTT_READINGS_QOS = int(os.getenv("MQTT_READINGS_QOS", "1"))
+MQTT_COMMAND_QOS = int(os.getenv("MQTT_COMMAND_QOS", "1"))
+
+COMMAND_TOPIC = "irrigation/zones/{zone_id}/command"
+STATE_TOPIC = "irrigation/zones/{zone_id}/state"
+
+
+class MqttUnavailable(Exception):
+    """paho-mqtt is not installed."""
+
+
+def _paho():
+    try:
+        import paho.mqtt.client as paho
+    except ImportError as e:
+        raise MqttUnavailable("paho-mqtt is required for MQTT_BROKER_URL=mqtt:// (pip install paho-mqtt)") from e
+    return paho
+
+
+def topic_matches(pattern: str, topic: str) -> bool:
+    """MQTT wildcard matching: `+` is one level, a trailing `#` any number of levels."""
+    pattern_levels = pattern.split("/")
+    topic_levels = topic.split("/")
+    for i, level in enumerate(pattern_levels):
+        if level == "#":
+            return True
+        if i >= len(topic_levels):
+            return False
+        if level != "+" and level != topic_levels[i]:
+            return False
+    return len(pattern_levels) == len(topic_levels)
+
+
+def _encode(payload: dict) -> bytes:
+    return json.dumps(payload, default=lambda v: v.isoformat() if hasattr(v, "isoformat") else str(v)).encode()
+
+
+# --- Transports ---
+class InProcessBroker:
+    """
+    Minimal broker living in this process: wildcard subscriptions, retained
+    messages and synchronous delivery (so every QoS is effectively "exactly once").
+    """
+
+    def __init__(self):
+        self._subscriptions = [] # (pattern, callback)
+        self._retained = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, pattern: str, callback: Callable[[str, bytes], None]):
+        with self._lock:
+            self._subscriptions.append((pattern, callback))
+            retained = [(topic, payload) for topic, payload in self._retained.items() if topic_matches(pattern, topic)]
+        for topic, payload in retained:
+            callback(topic, payload)
+
+    def unsubscribe(self, callback: Callable[[str, bytes], None]):
+        with self._lock:
+            self._subscriptions = [(p, cb) for p, cb in self._subscriptions if cb is not callback]
+
+    def publish(self, topic: str, payload: bytes, qos: int = 0, retain: bool = False):
+        with self._lock:
+            if retain:
+                if payload:
+                    self._retained[topic] = payload
+                else:
+                    self._retained.pop(topic, None) # Empty retained payload clears it, as in MQTT
+            targets = [cb for pattern, cb in self._subscriptions if topic_matches(pattern, topic)]
+        for callback in targets:
+            callback(topic, payload)
+
+    def retained(self, topic: str) -> Optional[bytes]:
+        return self._retained.get(topic)
+
+
+local_broker = InProcessBroker()
+
+
+class LocalTransport:
+    def __init__(self, broker: InProcessBroker, on_message: Callable[[str, bytes], None]):
+        self.broker = broker
+        self.on_message = on_message
+        self.connected = True
+
+    def subscribe(self, topic: str, qos: int):
+        self.broker.subscribe(topic, self.on_message)
+
+    def publish(self, topic: str, payload: bytes, qos: int, retain: bool):
+        self.broker.publish(topic, payload, qos=qos, retain=retain)
+
+    def close(self):
+        self.broker.unsubscribe(self.on_message)
+        self.connected = False
+
+
+class PahoTransport:
+    """paho-mqtt client on its own network thread; reconnects and resubscribes by itself."""
+
+    def __init__(self, url: str, on_message: Callable[[str, bytes], None]):
+        paho = _paho()
+        parsed = urlparse(url)
+        tls = parsed.scheme in ("mqtts", "ssl")
+        try:
+            client = paho.Client(paho.CallbackAPIVersion.VERSION2, client_id=MQTT_CLIENT_ID)
+        except AttributeError: # paho-mqtt < 2.0
+            client = paho.Client(client_id=MQTT_CLIENT_ID)
+        if MQTT_USERNAME:
+            client.username_pw_set(MQTT_USERNAME, MQTT_PASSWORD)
+        if tls:
+            client.tls_set()
+        client.on_connect = self._on_connect
+        client.on_disconnect = self._on_disconnect
+        client.on_message = lambda _client, _userdata, message: on_message(message.topic, message.payload)
+        client.reconnect_delay_set(min_delay=1, max_delay=30)
+        self.client = client
+        self.connected = False
+        self._subscriptions = []
+        client.connect_async(parsed.hostname or "localhost", parsed.port or (8883 if tls else 1883))
+        client.loop_start()
+
+    def _on_connect(self, client, *args):
+        self.connected = True
+        for topic, qos in self._subscriptions:
+            client.subscribe(topic, qos)
+
+    def _on_disconnect(self, *args):
+        self.connected = False
+
+    def subscribe(self, topic: str, qos: int):
+        self._subscriptions.append((topic, qos))
+        if self.connected:
+            self.client.subscribe(topic, qos)
+
+    def publish(self, topic: str, payload: bytes, qos: int, retain: bool):
+        # Queued by paho while disconnected (QoS > 0) and sent on reconnect
+        self.client.publish(topic, payload, qos=qos, retain=retain)
+
+    def close(self):
+        self.client.disconnect()
+        self.client.loop_stop()
+        self.connected = False
+
+
+def _transport(url: str, on_message: Callable[[str, bytes], None]):
+    if url.startswith("memory://"):
+        return LocalTransport(local_broker, on_message)
+    return PahoTransport(url, on_message)
+
+
+# --- Bridge ---
+class MqttBridge:
+    def __init__(self):
+        self._transport = None
+        self._loop = None
+        self._sink: Optional[Callable[[schemas.SensorReadingCreate], None]] = None
+
+        # Metrics
+        self.messages_received = 0
+        self.readings_enqueued = 0
+        self.readings_invalid = 0
+        self.readings_skipped = 0
+        self.readings_dropped = 0 # Ingestion buffer full
+        self.commands_published = 0
+        self.commands_unsent = 0
+        self.states_published = 0
+
+    @property
+    def running(self) -> bool:
+        return self._transport is not None
+
+    def start(self, loop, sink: Callable[[schemas.SensorReadingCreate], None], url: str = MQTT_BROKER_URL):
+        """
+        `sink` takes one reading and must be called on `loop` (ingestion.buffer.enqueue);
+        it raises to refuse the reading.
+        """
+        if self._transport is not None:
+            return
+        self._loop = loop
+        self._sink = sink
+        self._transport = _transport(url, self._on_message)
+        self._transport.subscribe(MQTT_READINGS_TOPIC, MQTT_READINGS_QOS)
+        print(f"MQTT bridge started ({url}, readings on {MQTT_READINGS_TOPIC})")
+
+    def stop(self):
+        if self._transport is None:
+            return
+        self._transport.close()
+        self._transport = None
+
+    def _on_message(self, topic: str, payload: bytes):
+        # Transport thread: parse and filter here, only the enqueue runs on the event loop
+        self.messages_received += 1
+        readings = self.parse_readings(topic, payload)
+        admitted = []
+        for reading in readings:
+            if ingest_filter.gate.admit(reading) is None:
+                admitted.append(reading)
+            else:
+                self.readings_skipped += 1
+        if admitted:
+            self._loop.call_soon_threadsafe(self._enqueue, admitted)
+
+    def parse_readings(self, topic: str, payload: bytes) -> List[schemas.SensorReadingCreate]:
+        levels = topic.split("/")
+        if len(levels) != 3 or not levels[1]:
+            self.readings_invalid += 1
+            return []
+        try:
+            items = json.loads(payload)
+        except ValueError:
+            self.readings_invalid += 1
+            return []
+        if not isinstance(items, list):
+            items = [items]
+        readings = []
+        for item in items:
+            try:
+                # The topic names the sensor, whatever the payload says
+                readings.append(schemas.SensorReadingCreate.model_validate({**item, "sensor_id": levels[1]}))
+            except (TypeError, ValidationError):
+                self.readings_invalid += 1
+        return readings
+
+    def _enqueue(self, readings: List[schemas.SensorReadingCreate]):
+        for reading in readings:
+            try:
+                self._sink(reading)
+            except Exception:
+                ingest_filter.gate.discard(reading)
+                self.readings_dropped += 1
+                continue
+            self.readings_enqueued += 1
+
+    def send_command(self, zone_id: int, action: str, **params):
+        """Pump command for a zone's controller ('on', 'off', 'timer' with seconds=...)."""
+        if self._transport is None:
+            self.commands_unsent += 1 # MQTT disabled: no controller to reach
+            return
+        self._transport.publish(COMMAND_TOPIC.format(zone_id=zone_id), _encode({"action": action, **params}), MQTT_COMMAND_QOS, False)
+        self.commands_published += 1
+
+    def publish_zone_state(self, zone: dict):
+        """Retained desired state of a zone (called by crud after every committed zone change)."""
+        if self._transport is None:
+            return
+        self._transport.publish(STATE_TOPIC.format(zone_id=zone["id"]), _encode(zone), MQTT_COMMAND_QOS, True)
+        self.states_published += 1
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.running,
+            "connected": bool(self._transport and self._transport.connected),
+            "messages_received": self.messages_received,
+            "readings_enqueued": self.readings_enqueued,
+            "readings_invalid": self.readings_invalid,
+            "readings_skipped": self.readings_skipped,
+            "readings_dropped": self.readings_dropped,
+            "commands_published": self.commands_published,
+            "commands_unsent": self.commands_unsent,
+            "states_published": self.states_published,
+        }
+
+
+bridge = MqttBridge()
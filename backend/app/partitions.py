@@ -0,0 +1,157 @@
+"""
+Range partitions of dev.sensor_readings and the retention job.
+
+The table is partitioned by `timestamp` (see the e7f3b2d84a10 migration). Partitions
+are named sensor_readings_pYYYYMM (monthly) or sensor_readings_pYYYYMMDD (daily)
+and this module keeps SENSOR_PARTITIONS_AHEAD upcoming ones created. With
+SENSOR_RETENTION_DAYS > 0, partitions whose whole range is older than that are
+dropped (or only detached with SENSOR_RETENTION_ACTION=detach, which keeps the
+table around as an archive that queries no longer touch). With
+ARCHIVE_BEFORE_RETENTION=true they are exported to Parquet first (app/archive.py).
+Summaries and rollups are not reduced when raw partitions go away.
+"""
+import os
+import re
+from datetime import date, datetime, timedelta
+from typing import List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from . import archive, etags
+from .database import SessionLocal
+
+SENSOR_PARTITION_INTERVAL = os.getenv("SENSOR_PARTITION_INTERVAL", "month") # 'month' or 'day'
+SENSOR_PARTITIONS_AHEAD = int(os.getenv("SENSOR_PARTITIONS_AHEAD", "2"))
+SENSOR_RETENTION_DAYS = int(os.getenv("SENSOR_RETENTION_DAYS", "0")) # 0 = keep everything
+SENSOR_RETENTION_ACTION = os.getenv("SENSOR_RETENTION_ACTION", "drop") # 'drop' or 'detach'
+PARTITION_MAINTENANCE_ENABLED = os.getenv("PARTITION_MAINTENANCE_ENABLED", "true").lower() in ("1", "true", "yes")
+PARTITION_MAINTENANCE_INTERVAL = float(os.getenv("PARTITION_MAINTENANCE_INTERVAL", "3600"))
+
+_PARTITION_NAME = re.compile(r"^sensor_readings_p(\d{6}|\d{8})$")
+
+
+def period_start(day: date, interval: str = SENSOR_PARTITION_INTERVAL) -> date:
+    return day if interval == "day" else day.replace(day=1)
+
+
+def next_period(start: date, interval: str = SENSOR_PARTITION_INTERVAL) -> date:
+    if interval == "day":
+        return start + timedelta(days=1)
+    return date(start.year + (start.month == 12), start.month % 12 + 1, 1)
+
+
+def partition_name(start: date, interval: str = SENSOR_PARTITION_INTERVAL) -> str:
+    return f"sensor_readings_p{start.strftime('%Y%m%d' if interval == 'day' else '%Y%m')}"
+
+
+def partition_bounds(name: str) -> Optional[Tuple[date, date]]:
+    """[start, end) of a partition from its name, None for the default partition or unknown tables."""
+    match = _PARTITION_NAME.match(name)
+    if not match:
+        return None
+    suffix = match.group(1)
+    if len(suffix) == 8:
+        start = datetime.strptime(suffix, "%Y%m%d").date()
+        return start, next_period(start, "day")
+    start = datetime.strptime(suffix, "%Y%m").date()
+    return start, next_period(start, "month")
+
+
+def is_partitioned(db: Session) -> bool:
+    return db.execute(text("""
+        SELECT 1 FROM pg_partitioned_table pt
+        JOIN pg_class c ON c.oid = pt.partrelid
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE n.nspname = 'dev' AND c.relname = 'sensor_readings'
+    """)).first() is not None
+
+
+def list_partitions(db: Session) -> List[Tuple[str, date, date]]:
+    """Attached range partitions as (name, start, end), oldest first."""
+    names = db.execute(text("""
+        SELECT c.relname FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        JOIN pg_class p ON p.oid = i.inhparent
+        JOIN pg_namespace n ON n.oid = p.relnamespace
+        WHERE n.nspname = 'dev' AND p.relname = 'sensor_readings'
+    """)).scalars().all()
+    partitions = []
+    for name in names:
+        bounds = partition_bounds(name)
+        if bounds:
+            partitions.append((name, bounds[0], bounds[1]))
+    return sorted(partitions, key=lambda p: p[1])
+
+
+def ensure_partitions(db: Session, today: Optional[date] = None) -> List[str]:
+    """
+    Creates the current and the next SENSOR_PARTITIONS_AHEAD partitions if missing.
+    Periods already covered by an existing partition (e.g. a monthly one while
+    running daily) are skipped. Returns the names created.
+    """
+    existing = list_partitions(db)
+    start = period_start(today or datetime.utcnow().date())
+    created = []
+    for _ in range(SENSOR_PARTITIONS_AHEAD + 1):
+        end = next_period(start)
+        if not any(p_start < end and start < p_end for _, p_start, p_end in existing):
+            name = partition_name(start)
+            try:
+                db.execute(text(
+                    f"CREATE TABLE IF NOT EXISTS dev.{name} PARTITION OF dev.sensor_readings "
+                    f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+                ))
+                db.commit()
+                created.append(name)
+            except Exception as e:
+                # e.g. rows for that range already sitting in the default partition
+                db.rollback()
+                print(f"WARNING: could not create partition {name}: {e}")
+        start = end
+    return created
+
+
+def expired_partitions(db: Session, now: Optional[datetime] = None) -> List[Tuple[str, date, date]]:
+    if SENSOR_RETENTION_DAYS <= 0:
+        return []
+    cutoff = (now or datetime.utcnow()).date() - timedelta(days=SENSOR_RETENTION_DAYS)
+    return [p for p in list_partitions(db) if p[2] <= cutoff]
+
+
+def apply_retention(db: Session, now: Optional[datetime] = None) -> List[str]:
+    """Drops (or detaches) every partition entirely older than the retention window."""
+    removed = []
+    for name, start, end in expired_partitions(db, now):
+        try:
+            if archive.ARCHIVE_BEFORE_RETENTION:
+                result = archive.export_readings(
+                    db, before=datetime.combine(end, datetime.min.time()), since=datetime.combine(start, datetime.min.time())
+                )
+                print(f"Archived {result['rows']} readings of {name} before retention")
+            if SENSOR_RETENTION_ACTION == "detach":
+                db.execute(text(f"ALTER TABLE dev.sensor_readings DETACH PARTITION dev.{name}"))
+            else:
+                db.execute(text(f"DROP TABLE IF EXISTS dev.{name}"))
+            db.commit()
+            removed.append(name)
+            etags.versions.bump("readings_retention") # Raw history of every sensor may have changed
+        except Exception as e:
+            db.rollback()
+            print(f"WARNING: retention could not remove partition {name}: {e}")
+    return removed
+
+
+def run_maintenance():
+    """Creates upcoming partitions and applies retention. Safe to run from several workers."""
+    db = SessionLocal()
+    try:
+        if not is_partitioned(db):
+            return {"created": [], "removed": []}
+        created = ensure_partitions(db)
+        removed = apply_retention(db)
+        if created or removed:
+            print(f"Partition maintenance: created={created} removed={removed}")
+        return {"created": created, "removed": removed}
+    finally:
+        db.close()
@@ -0,0 +1,75 @@
+"""
+Statement budgets: fail loudly when a code path sends more SQL than expected.
+
+    with statement_budget(1, "admin messages page"):
+        crud.get_messages_page(db)
+
+Counts every statement sent through the sync and async engines while the block
+runs in the current context (a request handler, a script), so N+1 lazy loads
+show up as a QueryBudgetExceeded listing the statements. Work running in other
+threads or tasks at the same time is not counted. Meant for the tests
+(tests/test_query_budgets.py) and check scripts such as check_query_budgets.py,
+not for the request path.
+"""
+import contextvars
+from contextlib import contextmanager
+from typing import List, Optional
+
+from sqlalchemy import event
+
+from .database import async_engine, engine
+
+_active: contextvars.ContextVar[Optional["StatementCounter"]] = contextvars.ContextVar("statement_counter", default=None)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class StatementCounter:
+    def __init__(self):
+        self.statements: List[str] = []
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    counter = _active.get()
+    if counter is not None:
+        counter.statements.append(statement)
+
+
+_installed = False
+
+
+def _install():
+    global _installed
+    if _installed:
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(async_engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+    _installed = True
+
+
+@contextmanager
+def count_statements():
+    """Yields a StatementCounter filled with the statements run inside the block."""
+    _install()
+    counter = StatementCounter()
+    token = _active.set(counter)
+    try:
+        yield counter
+    finally:
+        _active.reset(token)
+
+
+@contextmanager
+def statement_budget(limit: int, label: str = "block"):
+    """Raises QueryBudgetExceeded if the block runs more than `limit` statements."""
+    with count_statements() as counter:
+        yield counter
+    if counter.count > limit:
+        listing = "\n".join(f"  {i + 1}. {' '.join(sql.split())[:200]}" for i, sql in enumerate(counter.statements))
+        raise QueryBudgetExceeded(f"{label}: {counter.count} statements, budget {limit}\n{listing}")
@@ -0,0 +1,181 @@
+"""
+Humidity rules for irrigation zones in 'auto' mode.
+
+Each rule ties a sensor to a zone with a hysteresis band: it starts asking for
+water when the sensor's humidity drops below min_humidity and stops once it
+reaches max_humidity. A zone's pump should run while any of its rules asks
+for water.
+
+Rules are kept in memory, indexed by sensor_id, and evaluated incrementally as
+readings are committed (crud calls `evaluate`): a reading only touches the
+rules of its own sensor and compares two floats, no history query. Only when
+a rule's demand flips does the engine call `sync(demands, zone_ids)`, which
+main runs in a worker thread (crud.sync_auto_zones + MQTT commands).
+
+Every uvicorn worker ingests readings and runs its own engine, so the
+hysteresis state is not kept per process: a rule's demand lives in
+dev.irrigation_rules.demand and a zone's pump is switched with a
+compare-and-set against what its rules want, so workers never undo each
+other's decision and a flip sends one command. The copy in memory only
+decides when to write; each worker reloads rules, demands and zone modes
+every RULES_RELOAD_SECONDS (and after a rule edit it handled itself) and
+then re-syncs any auto zone whose pump disagrees with its rules. A worker
+holding a stale demand can therefore miss a flip for at most that interval.
+"""
+import asyncio
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+RULES_RELOAD_SECONDS = float(os.getenv("RULES_RELOAD_SECONDS", "10"))
+
+
+class _Rule:
+    __slots__ = ("id", "zone_id", "sensor_id", "min_humidity", "max_humidity", "demand")
+
+    def __init__(self, rule):
+        self.id = rule.id
+        self.zone_id = rule.zone_id
+        self.sensor_id = rule.sensor_id
+        self.min_humidity = rule.min_humidity
+        self.max_humidity = rule.max_humidity
+        self.demand = bool(rule.demand) # True while the rule asks for water (as last seen in the DB)
+
+
+class RulesEngine:
+    def __init__(self):
+        self._by_sensor: Dict[str, List[_Rule]] = {}
+        self._by_zone: Dict[int, List[_Rule]] = {}
+        self._auto_zones: Set[int] = set()
+        self._lock = threading.Lock() # Readings are committed from worker threads and the event loop
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._sync: Optional[Callable[[Dict[int, bool], List[int]], list]] = None
+        self._inflight: Set[asyncio.Task] = set()
+
+        # Metrics
+        self.readings_evaluated = 0
+        self.evaluation_seconds = 0.0
+        self.transitions = 0
+        self.reloads = 0
+        self.syncs = 0
+        self.switches = 0
+        self.switch_errors = 0
+
+    def start(self, loop: asyncio.AbstractEventLoop, sync: Callable[[Dict[int, bool], List[int]], list], rules: Iterable, zones: Iterable):
+        """
+        `sync(demands, zone_ids)` is a blocking callable returning the zones it switched;
+        `rules`/`zones` are the current DB rows.
+        """
+        self._loop = loop
+        self._sync = sync
+        self.load(rules, zones)
+        print(f"Irrigation rules engine started ({len(self._by_zone)} zones with rules, {len(self._auto_zones)} in auto mode)")
+
+    def load(self, rules: Iterable, zones: Iterable):
+        """Replaces rules, demands and zone modes with the DB rows; re-syncs auto zones that disagree."""
+        zones = list(zones)
+        with self._lock:
+            by_sensor: Dict[str, List[_Rule]] = {}
+            by_zone: Dict[int, List[_Rule]] = {}
+            for rule in rules:
+                if not rule.enabled:
+                    continue
+                compiled = _Rule(rule)
+                by_sensor.setdefault(compiled.sensor_id, []).append(compiled)
+                by_zone.setdefault(compiled.zone_id, []).append(compiled)
+            self._by_sensor = by_sensor
+            self._by_zone = by_zone
+            self._auto_zones = {zone.id for zone in zones if zone.mode == "auto"}
+            stale = [
+                zone.id for zone in zones
+                if zone.mode == "auto" and bool(zone.is_pump_active) != self._wanted(zone.id)
+            ]
+            self.reloads += 1
+        if stale:
+            self._dispatch({}, stale)
+
+    def track_zone(self, zone_id: int, mode: Optional[str], is_pump_active: bool):
+        """Called by crud after every committed zone change."""
+        with self._lock:
+            if mode != "auto":
+                self._auto_zones.discard(zone_id)
+                return
+            self._auto_zones.add(zone_id)
+            stale = bool(is_pump_active) != self._wanted(zone_id)
+        if stale:
+            self._dispatch({}, [zone_id])
+
+    def evaluate(self, rows: List[dict]):
+        """Feeds committed readings (dicts with sensor_id and humidity) through the rules."""
+        if not self._by_sensor:
+            return
+        started = time.perf_counter()
+        demands: Dict[int, bool] = {}
+        zone_ids: Set[int] = set()
+        with self._lock:
+            by_sensor = self._by_sensor
+            for row in rows:
+                rules = by_sensor.get(row["sensor_id"])
+                if not rules:
+                    continue
+                humidity = row["humidity"]
+                for rule in rules:
+                    if rule.demand:
+                        if humidity < rule.max_humidity:
+                            continue
+                        rule.demand = False
+                    else:
+                        if humidity >= rule.min_humidity:
+                            continue
+                        rule.demand = True
+                    self.transitions += 1
+                    # Stored even for zones not in auto mode: the state must survive a switch to auto
+                    demands[rule.id] = rule.demand
+                    zone_ids.add(rule.zone_id)
+            self.readings_evaluated += len(rows)
+            self.evaluation_seconds += time.perf_counter() - started
+        if demands:
+            self._dispatch(demands, list(zone_ids))
+
+    def _wanted(self, zone_id: int) -> bool:
+        """Lock held."""
+        return any(rule.demand for rule in self._by_zone.get(zone_id, ()))
+
+    def _dispatch(self, demands: Dict[int, bool], zone_ids: List[int]):
+        # Never on the ingest path: the DB write and MQTT commands run in a worker thread
+        if self._loop is None or self._sync is None:
+            return
+        self._loop.call_soon_threadsafe(self._spawn, demands, zone_ids)
+
+    def _spawn(self, demands: Dict[int, bool], zone_ids: List[int]):
+        task = asyncio.create_task(self._run_sync(demands, zone_ids))
+        self._inflight.add(task)
+        task.add_done_callback(self._inflight.discard)
+
+    async def _run_sync(self, demands: Dict[int, bool], zone_ids: List[int]):
+        try:
+            switched = await asyncio.to_thread(self._sync, demands, zone_ids)
+            self.syncs += 1
+            self.switches += len(switched)
+        except Exception as e:
+            # The local demands may now be ahead of the DB; the next reload resets them
+            self.switch_errors += 1
+            print(f"ERROR: auto irrigation could not sync zones {zone_ids}: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "rules": sum(len(rules) for rules in self._by_zone.values()),
+            "sensors": len(self._by_sensor),
+            "auto_zones": len(self._auto_zones),
+            "readings_evaluated": self.readings_evaluated,
+            "avg_evaluation_us": self.evaluation_seconds * 1e6 / self.readings_evaluated if self.readings_evaluated else 0.0,
+            "transitions": self.transitions,
+            "reloads": self.reloads,
+            "syncs": self.syncs,
+            "switches": self.switches,
+            "switch_errors": self.switch_errors,
+        }
+
+
+engine = RulesEngine()
@@ -0,0 +1,147 @@
+"""
+Server-side irrigation timers.
+
+The deadline of a running timer is persisted in irrigation_zones.timer_ends_at;
+this module only keeps them in a min-heap and runs a single task on the event
+loop that sleeps until the earliest one. Due timers are handed to `expire`
+(in a worker thread) in one batch, which switches the pumps off in the database.
+No task per zone and no periodic table scan: the table is read once at startup
+(the timers passed to `start`), after that crud keeps the heap in step via `track`.
+
+Superseded heap entries (timer re-armed or cancelled) are skipped lazily when
+they reach the top, `_deadlines` holds the current deadline of each zone.
+"""
+import asyncio
+import heapq
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+Due = List[Tuple[int, datetime]] # (zone_id, deadline)
+
+
+class TimerScheduler:
+    def __init__(self):
+        self._heap: List[Tuple[datetime, int]] = []
+        self._deadlines: Dict[int, datetime] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._expire: Optional[Callable[[Due], None]] = None
+
+        # Metrics
+        self.scheduled_total = 0
+        self.cancelled_total = 0
+        self.expired_total = 0
+        self.expire_errors = 0
+        self.max_lag_seconds = 0.0 # Worst delay between a deadline and the pump going off
+
+    def start(self, loop: asyncio.AbstractEventLoop, expire: Callable[[Due], None], active: Iterable[Tuple[int, datetime]] = ()):
+        """`expire(due)` is a blocking callable; `active` are the timers persisted before a restart."""
+        if self._task is not None:
+            return
+        self._loop = loop
+        self._expire = expire
+        self._wakeup = asyncio.Event()
+        for zone_id, ends_at in active:
+            self._set(zone_id, ends_at)
+        self._task = asyncio.create_task(self._run())
+        print(f"Irrigation timer scheduler started ({len(self._deadlines)} running timers restored)")
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def track(self, zone_id: int, ends_at: Optional[datetime]):
+        """
+        Records a zone's current deadline (None cancels its timer).
+        Safe to call from worker threads; a no-op until the scheduler is started.
+        """
+        if self._loop is None:
+            return
+        try:
+            on_loop = asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            on_loop = False
+        if on_loop:
+            self._set(zone_id, ends_at)
+        else:
+            self._loop.call_soon_threadsafe(self._set, zone_id, ends_at)
+
+    def _set(self, zone_id: int, ends_at: Optional[datetime]):
+        current = self._deadlines.get(zone_id)
+        if ends_at == current:
+            return
+        if ends_at is None:
+            del self._deadlines[zone_id]
+            self.cancelled_total += 1
+            return
+        self._deadlines[zone_id] = ends_at
+        heapq.heappush(self._heap, (ends_at, zone_id))
+        self.scheduled_total += 1
+        if self._heap[0] == (ends_at, zone_id):
+            self._wakeup.set() # New earliest deadline, shorten the current sleep
+
+    def _pop_due(self, now: datetime) -> Due:
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            ends_at, zone_id = heapq.heappop(self._heap)
+            if self._deadlines.get(zone_id) != ends_at:
+                continue # Superseded entry
+            del self._deadlines[zone_id]
+            due.append((zone_id, ends_at))
+        return due
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            # Drop superseded entries so the sleep below targets a live deadline
+            while self._heap and self._deadlines.get(self._heap[0][1]) != self._heap[0][0]:
+                heapq.heappop(self._heap)
+            timeout = None
+            if self._heap:
+                timeout = max(0.0, (self._heap[0][0] - datetime.utcnow()).total_seconds())
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+                continue # Woken by an earlier deadline, recompute
+            except asyncio.TimeoutError:
+                pass
+
+            now = datetime.utcnow()
+            due = self._pop_due(now)
+            if not due:
+                continue
+            self.max_lag_seconds = max(self.max_lag_seconds, max((now - ends_at).total_seconds() for _, ends_at in due))
+            try:
+                await asyncio.to_thread(self._expire, due)
+                self.expired_total += len(due)
+            except Exception as e:
+                self.expire_errors += 1
+                print(f"ERROR: expiring {len(due)} irrigation timers failed: {e}")
+                # Still persisted: put them back (unless re-armed meanwhile) and retry shortly
+                for zone_id, ends_at in due:
+                    if zone_id not in self._deadlines:
+                        self._deadlines[zone_id] = ends_at
+                        heapq.heappush(self._heap, (ends_at, zone_id))
+                await asyncio.sleep(1)
+
+    def stats(self) -> dict:
+        return {
+            "running": self._task is not None,
+            "active_timers": len(self._deadlines),
+            "heap_size": len(self._heap),
+            "next_deadline": min(self._deadlines.values()) if self._deadlines else None,
+            "scheduled_total": self.scheduled_total,
+            "cancelled_total": self.cancelled_total,
+            "expired_total": self.expired_total,
+            "expire_errors": self.expire_errors,
+            "max_lag_seconds": self.max_lag_seconds,
+        }
+
+
+timers = TimerScheduler()
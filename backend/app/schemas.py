@@ -1,4 +1,5 @@
-from pydantic import BaseModel, EmailStr, Field, field_validator
+import math
+from pydantic import BaseModel, EmailStr, Field, field_validator, model_validator
 from datetime import datetime
 from typing import Optional, List
 
@@ -31,6 +32,10 @@ class User(UserBase):
     class Config:
         from_attributes = True
 
+class UserPage(BaseModel):
+    items: List[User]
+    next_cursor: Optional[str] = None # Pass back as `cursor` to get the next page
+
 class UserUpdate(BaseModel):
     full_name: Optional[str] = None
     email: Optional[EmailStr] = None
@@ -76,7 +81,10 @@ class SensorReadingBase(BaseModel):
     humidity: float
 
 class SensorReadingCreate(SensorReadingBase):
-    pass
+    # Optional device-side sequence number / measurement time. Only used to drop
+    # retransmissions (see ingest_filter); the stored timestamp is the arrival time.
+    seq: Optional[int] = None
+    timestamp: Optional[datetime] = None
 
 class SensorReading(SensorReadingBase):
     id: int
@@ -85,6 +93,37 @@ class SensorReading(SensorReadingBase):
     class Config:
         from_attributes = True
 
+class SensorReadingPage(BaseModel):
+    items: List[SensorReading]
+    next_cursor: Optional[str] = None # Pass back as `cursor` to get the next page
+
+class SensorBatchRejection(BaseModel):
+    index: int # Position of the item in the submitted batch
+    error: str
+
+class SensorBatchResult(BaseModel):
+    accepted: int
+    rejected: int
+    skipped: int = 0 # Duplicates or inside the deadband, not stored
+    errors: List[SensorBatchRejection] = []
+
+class SensorHistoryPoint(BaseModel):
+    bucket: datetime # Bucket start, or the reading time for raw points
+    count: int
+    temperature_avg: float
+    temperature_min: float
+    temperature_max: float
+    humidity_avg: float
+    humidity_min: float
+    humidity_max: float
+
+class SensorHistory(BaseModel):
+    sensor_id: str
+    resolution: str # 'raw', '1m', '1h' or '1d'
+    start: datetime
+    end: datetime
+    points: List[SensorHistoryPoint]
+
 # --- Dashboard Stats Schema ---
 class DashboardStats(BaseModel):
     avg_temperature: float
@@ -110,8 +149,47 @@ class IrrigationZoneUpdate(BaseModel):
 class IrrigationZone(IrrigationZoneBase):
     id: int
     last_watered: Optional[datetime] = None
+    timer_ends_at: Optional[datetime] = None # UTC; clients can count down locally from it
     timer_seconds_remaining: int = 0
 
+    @model_validator(mode="after")
+    def compute_timer_remaining(self):
+        # Always derived from the deadline, so it is current whenever the zone is serialized
+        if self.timer_ends_at is None:
+            self.timer_seconds_remaining = 0
+        else:
+            self.timer_seconds_remaining = max(0, math.ceil((self.timer_ends_at - datetime.utcnow()).total_seconds()))
+        return self
+
+    class Config:
+        from_attributes = True
+
+class IrrigationRuleBase(BaseModel):
+    zone_id: int
+    sensor_id: str
+    min_humidity: float # Pump ON below this humidity
+    max_humidity: float # Pump OFF at or above this humidity
+    enabled: bool = True
+
+    @model_validator(mode="after")
+    def check_hysteresis(self):
+        if self.max_humidity <= self.min_humidity:
+            raise ValueError("max_humidity must be greater than min_humidity")
+        return self
+
+class IrrigationRuleCreate(IrrigationRuleBase):
+    pass
+
+class IrrigationRuleUpdate(BaseModel):
+    sensor_id: Optional[str] = None
+    min_humidity: Optional[float] = None
+    max_humidity: Optional[float] = None
+    enabled: Optional[bool] = None
+
+class IrrigationRule(IrrigationRuleBase):
+    id: int
+    created_at: datetime
+
     class Config:
         from_attributes = True
 
@@ -133,6 +211,10 @@ class UserMessage(UserMessageBase):
     class Config:
         from_attributes = True
 
+class UserMessagePage(BaseModel):
+    items: List[UserMessage]
+    next_cursor: Optional[str] = None
+
 # --- Admin Stats Schema ---
 class AdminStats(BaseModel):
     total_users: int
@@ -0,0 +1,66 @@
+"""
+In-memory snapshot of the irrigation zone list served by GET /irrigation/zones.
+
+The snapshot is tagged with the "zones" change counter (app/etags.py), which
+crud bumps after every committed zone write; a poll only reloads from Postgres
+when that counter moved, so steady-state polls run no query at all.
+ZONE_SNAPSHOT_TTL_SECONDS bounds how stale it can get when another worker
+process changed a zone (its counter is not shared).
+"""
+import os
+import threading
+import time
+from typing import List, Optional
+
+from . import crud, etags, schemas
+from .database import SessionLocal
+
+ZONE_SNAPSHOT_TTL_SECONDS = float(os.getenv("ZONE_SNAPSHOT_TTL_SECONDS", "30"))
+
+
+class ZoneSnapshot:
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._zones: Optional[List[schemas.IrrigationZone]] = None
+        self._version: Optional[int] = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock() # One reload at a time, concurrent pollers reuse its result
+
+        # Metrics
+        self.hits = 0
+        self.reloads = 0
+
+    def _fresh(self, version: int) -> bool:
+        return self._zones is not None and self._version == version and time.monotonic() - self._loaded_at < self.ttl
+
+    def get(self) -> List[schemas.IrrigationZone]:
+        version = etags.versions.get("zones")
+        if self._fresh(version):
+            self.hits += 1
+            return self._zones
+        with self._lock:
+            version = etags.versions.get("zones")
+            if self._fresh(version):
+                self.hits += 1
+                return self._zones
+            # Version read before the query: a write racing with it leaves the snapshot already outdated
+            db = SessionLocal()
+            try:
+                zones = [schemas.IrrigationZone.model_validate(zone) for zone in crud.get_irrigation_zones(db, skip=0, limit=None)]
+            finally:
+                db.close()
+            self._zones, self._version, self._loaded_at = zones, version, time.monotonic()
+            self.reloads += 1
+            return zones
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.reloads
+        return {
+            "zones": len(self._zones) if self._zones is not None else 0,
+            "hits": self.hits,
+            "reloads": self.reloads,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+snapshot = ZoneSnapshot(ZONE_SNAPSHOT_TTL_SECONDS)
@@ -0,0 +1,227 @@
+"""
+Counts database round trips per write: the old add/commit/refresh pattern against
+the INSERT/UPDATE ... RETURNING functions in crud.py.
+
+Run from backend/ against a development database:
+    python benchmark_roundtrips.py [--repeat 20]
+
+Every row it creates is named/prefixed 'bench-' and deleted at the end
+(readings, summaries and rollups of the 'bench-<tag>' sensor included).
+"""
+import argparse
+import time
+import uuid
+from datetime import datetime
+
+from dotenv import load_dotenv
+from sqlalchemy import delete, event
+from sqlalchemy.orm import sessionmaker
+
+from app import crud, models, schemas
+from app.database import engine, SessionLocal
+
+load_dotenv()
+
+# The session factory the old code ran with (expire_on_commit=True is the SQLAlchemy default)
+LegacySession = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+FAKE_HASH = "bench-not-a-real-hash"
+
+
+class RoundTripCounter:
+    """Counts statements sent through the engine plus COMMITs (one round trip each)."""
+
+    def __init__(self):
+        self.count = 0
+        event.listen(engine, "before_cursor_execute", self._statement)
+        event.listen(engine, "commit", self._commit)
+
+    def _statement(self, *args):
+        self.count += 1
+
+    def _commit(self, *args):
+        self.count += 1
+
+    def close(self):
+        event.remove(engine, "before_cursor_execute", self._statement)
+        event.remove(engine, "commit", self._commit)
+
+
+# --- Old write paths, kept here only for comparison ---
+def legacy_create_user(db, user):
+    db_user = models.User(email=user.email, full_name=user.full_name, hashed_password=FAKE_HASH)
+    db.add(db_user)
+    db.commit()
+    db.refresh(db_user)
+    return db_user
+
+def legacy_update_user_admin(db, user_id, user_update):
+    db_user = db.query(models.User).filter(models.User.id == user_id).first()
+    for key, value in user_update.model_dump(exclude_unset=True).items():
+        setattr(db_user, key, value)
+    db.add(db_user)
+    db.commit()
+    db.refresh(db_user)
+    db.commit()
+    db.refresh(db_user)
+    return db_user
+
+def legacy_create_zone(db, zone):
+    db_zone = models.IrrigationZone(name=zone.name, is_pump_active=zone.is_pump_active, mode=zone.mode)
+    db.add(db_zone)
+    db.commit()
+    db.refresh(db_zone)
+    return db_zone
+
+def legacy_update_zone(db, zone_id, zone_update):
+    db_zone = db.query(models.IrrigationZone).filter(models.IrrigationZone.id == zone_id).first()
+    for key, value in zone_update.model_dump(exclude_unset=True).items():
+        setattr(db_zone, key, value)
+    db.add(db_zone)
+    db.commit()
+    db.refresh(db_zone)
+    return db_zone
+
+def legacy_toggle_pump(db, zone_id):
+    db_zone = db.query(models.IrrigationZone).filter(models.IrrigationZone.id == zone_id).first()
+    new_state = not db_zone.is_pump_active
+    update_data = schemas.IrrigationZoneUpdate(is_pump_active=new_state, mode="manual" if new_state else db_zone.mode)
+    for key, value in update_data.model_dump(exclude_unset=True).items():
+        setattr(db_zone, key, value)
+    db.commit()
+    db.refresh(db_zone)
+    return db_zone
+
+def legacy_create_message(db, message, user_id):
+    db_message = models.UserMessage(**message.model_dump(), user_id=user_id)
+    db.add(db_message)
+    db.commit()
+    db.refresh(db_message)
+    return db_message
+
+
+def legacy_create_sensor_reading(db, reading):
+    # Summary and rollup upserts ran in the same transaction, the reading itself was flushed at commit
+    db_reading = models.SensorReading(**reading.model_dump(exclude={"seq", "timestamp"}), timestamp=datetime.utcnow())
+    db.add(db_reading)
+    crud._apply_ingest_aggregates(db, [{**reading.model_dump(exclude={"seq", "timestamp"}), "timestamp": db_reading.timestamp}])
+    db.commit()
+    db.refresh(db_reading)
+    return db_reading
+
+
+def build_responses(response_model, obj):
+    # What FastAPI does with the returned object; must not trigger any extra query
+    return response_model.model_validate(obj)
+
+
+def scenarios(tag: str):
+    """(name, legacy callable, current callable, response model). Each callable gets (db, state)."""
+    reading = schemas.SensorReadingCreate(sensor_id=f"bench-{tag}", temperature=21.5, humidity=48.0)
+    return [
+        (
+            "create_sensor_reading",
+            lambda db, st: legacy_create_sensor_reading(db, reading),
+            lambda db, st: crud.create_sensor_reading(db, reading),
+            schemas.SensorReading,
+        ),
+        (
+            "create_user",
+            lambda db, st: st.setdefault("user", legacy_create_user(db, schemas.UserCreate(email=f"bench-{tag}-legacy@example.com", password="benchpass", full_name="bench"))),
+            lambda db, st: st.setdefault("user", crud.create_user(db, schemas.UserCreate(email=f"bench-{tag}-new@example.com", password="benchpass", full_name="bench"), FAKE_HASH)),
+            schemas.User,
+        ),
+        (
+            "update_user_admin",
+            lambda db, st: legacy_update_user_admin(db, st["user"].id, schemas.UserAdminUpdate(full_name="bench updated")),
+            lambda db, st: crud.update_user_admin(db, st["user"].id, schemas.UserAdminUpdate(full_name="bench updated")),
+            schemas.User,
+        ),
+        (
+            "create_user_message",
+            lambda db, st: legacy_create_message(db, schemas.UserMessageCreate(subject="bench", message="bench"), st["user"].id),
+            lambda db, st: crud.create_user_message(db, schemas.UserMessageCreate(subject="bench", message="bench"), st["user"].id),
+            schemas.UserMessage,
+        ),
+        (
+            "create_irrigation_zone",
+            lambda db, st: st.setdefault("zone", legacy_create_zone(db, schemas.IrrigationZoneCreate(name=f"bench-{tag}-legacy"))),
+            lambda db, st: st.setdefault("zone", crud.create_irrigation_zone(db, schemas.IrrigationZoneCreate(name=f"bench-{tag}-new"))),
+            schemas.IrrigationZone,
+        ),
+        (
+            "update_irrigation_zone",
+            lambda db, st: legacy_update_zone(db, st["zone"].id, schemas.IrrigationZoneUpdate(mode="timer")),
+            lambda db, st: crud.update_irrigation_zone(db, st["zone"].id, schemas.IrrigationZoneUpdate(mode="timer")),
+            schemas.IrrigationZone,
+        ),
+        (
+            "toggle_irrigation_pump",
+            lambda db, st: legacy_toggle_pump(db, st["zone"].id),
+            lambda db, st: crud.toggle_irrigation_pump(db, st["zone"].id),
+            schemas.IrrigationZone,
+        ),
+    ]
+
+
+def measure(session_factory, name_index: int, repeat: int, tag: str):
+    """Runs every scenario `repeat` times. Returns {name: (round trips per call, ms per call)}."""
+    results = {}
+    counter = RoundTripCounter()
+    state = {}
+    db = session_factory()
+    try:
+        for scenario in scenarios(tag):
+            name, fn, model = scenario[0], scenario[name_index], scenario[3]
+            # Creations run once (their result is the fixture for the next scenarios)
+            runs = 1 if name.startswith("create_") and name not in ("create_user_message", "create_sensor_reading") else repeat
+            counter.count = 0
+            started = time.perf_counter()
+            for _ in range(runs):
+                build_responses(model, fn(db, state))
+            elapsed = time.perf_counter() - started
+            results[name] = (counter.count / runs, elapsed * 1000 / runs)
+    finally:
+        counter.close()
+        db.close()
+    return results
+
+
+def cleanup(tag: str):
+    db = SessionLocal()
+    try:
+        users = models.User.email.like(f"bench-{tag}-%")
+        user_ids = [row.id for row in db.query(models.User.id).filter(users)]
+        if user_ids:
+            db.execute(delete(models.UserMessage).where(models.UserMessage.user_id.in_(user_ids)))
+        db.execute(delete(models.User).where(users))
+        db.execute(delete(models.IrrigationZone).where(models.IrrigationZone.name.like(f"bench-{tag}-%")))
+        for model in (models.SensorReading, models.SensorSummary, models.SensorRollup):
+            db.execute(delete(model).where(model.sensor_id == f"bench-{tag}"))
+        db.commit()
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Round trips per CRUD write, before and after RETURNING")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    tag = uuid.uuid4().hex[:8]
+    print(f"--- Round trips per write (repeat={args.repeat}) ---")
+    try:
+        legacy = measure(LegacySession, 1, args.repeat, tag)
+        current = measure(SessionLocal, 2, args.repeat, tag)
+    finally:
+        cleanup(tag)
+
+    print(f"   {'operation':<24} {'before':>7} {'after':>7} {'before ms':>10} {'after ms':>10}")
+    for name, (before, before_ms) in legacy.items():
+        after, after_ms = current[name]
+        print(f"   {name:<24} {before:>7.1f} {after:>7.1f} {before_ms:>10.2f} {after_ms:>10.2f}")
+    print("--- DONE ---")
+
+
+if __name__ == "__main__":
+    main()
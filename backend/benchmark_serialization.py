@@ -0,0 +1,80 @@
+"""
+Compares the two ways a large read response can be built: ORM rows validated
+through the from_attributes response model and encoded like FastAPI's
+JSONResponse, against column tuples encoded by app/fast_json.py.
+
+Run from backend/ against a development database:
+    python benchmark_serialization.py [--limit 10000] [--repeat 5]
+
+Read-only: it serializes the newest `--limit` sensor readings and users.
+"""
+import argparse
+import json
+import time
+from typing import List
+
+from dotenv import load_dotenv
+from pydantic import TypeAdapter
+
+from app import crud, fast_json, schemas
+from app.database import SessionLocal
+
+load_dotenv()
+
+
+def current_path(db, schema, load):
+    # What FastAPI does with a response_model: validate, dump to JSON-able data, json.dumps
+    adapter = TypeAdapter(List[schema])
+    data = adapter.dump_python(adapter.validate_python(load(db, False)), mode="json")
+    return json.dumps(data, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def fast_path(db, schema, load):
+    return fast_json.dumps(fast_json.as_dicts(schema, load(db, True)))
+
+
+def scenarios(limit: int):
+    """(name, response schema, load(db, project))"""
+    return [
+        ("sensor readings", schemas.SensorReading, lambda db, project: crud.get_recent_readings(db, limit=limit, project=project)),
+        ("users", schemas.User, lambda db, project: crud.get_users_page(db, limit=limit, project=project)[0]),
+    ]
+
+
+def measure(fn, repeat: int):
+    """Best-of-`repeat` milliseconds and the body of the last run."""
+    best = None
+    body = b""
+    for _ in range(repeat):
+        db = SessionLocal()
+        try:
+            started = time.perf_counter()
+            body = fn(db)
+            elapsed = (time.perf_counter() - started) * 1000
+        finally:
+            db.close()
+        best = elapsed if best is None else min(best, elapsed)
+    return best, body
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Response building time: ORM + Pydantic versus projected rows + fast JSON")
+    parser.add_argument("--limit", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    encoder = "orjson" if fast_json.orjson is not None else "json (orjson not installed)"
+    print(f"--- Serialization (limit={args.limit}, best of {args.repeat}, encoder: {encoder}) ---")
+    print(f"   {'response':<16} {'rows':>7} {'current ms':>11} {'fast ms':>9} {'speedup':>8} {'same JSON':>10}")
+    for name, schema, load in scenarios(args.limit):
+        current_ms, current_body = measure(lambda db: current_path(db, schema, load), args.repeat)
+        fast_ms, fast_body = measure(lambda db: fast_path(db, schema, load), args.repeat)
+        rows = len(json.loads(current_body))
+        same = json.loads(current_body) == json.loads(fast_body)
+        speedup = current_ms / fast_ms if fast_ms else 0.0
+        print(f"   {name:<16} {rows:>7} {current_ms:>11.1f} {fast_ms:>9.1f} {speedup:>7.1f}x {'yes' if same else 'NO':>10}")
+    print("--- DONE ---")
+
+
+if __name__ == "__main__":
+    main()
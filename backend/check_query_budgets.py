@@ -0,0 +1,95 @@
+"""
+Checks the number of SQL statements behind the admin and dashboard listings,
+response serialization included (what FastAPI does with the returned rows), so
+N+1 lazy loads are caught before they reach production.
+
+Run from backend/ against a development database:
+    python check_query_budgets.py
+
+Exits with status 1 if any listing exceeds its budget. Every row it creates is
+prefixed 'bench-' and deleted at the end.
+"""
+import sys
+import uuid
+
+from dotenv import load_dotenv
+from sqlalchemy import delete
+
+from app import crud, models, schemas
+from app.database import SessionLocal
+from app.query_budget import QueryBudgetExceeded, statement_budget
+
+load_dotenv()
+
+FAKE_HASH = "bench-not-a-real-hash"
+USERS = 3
+MESSAGES_PER_USER = 20
+
+
+def page(model, rows_and_more):
+    rows, _ = rows_and_more
+    return model(items=rows, next_cursor=None)
+
+
+def checks():
+    """(name, statement budget, callable(db))"""
+    return [
+        ("admin messages page", 1, lambda db: page(schemas.UserMessagePage, crud.get_messages_page(db, limit=50))),
+        ("admin unread messages page", 1, lambda db: page(schemas.UserMessagePage, crud.get_messages_page(db, unread_only=True, limit=50))),
+        ("admin users page", 1, lambda db: page(schemas.UserPage, crud.get_users_page(db, limit=50))),
+        ("admin stats", 1, lambda db: schemas.AdminStats(**crud.get_admin_stats(db), system_uptime="0m")),
+        ("irrigation zones", 1, lambda db: [schemas.IrrigationZone.model_validate(z) for z in crud.get_irrigation_zones(db, skip=0, limit=None)]),
+        ("irrigation rules", 1, lambda db: [schemas.IrrigationRule.model_validate(r) for r in crud.get_irrigation_rules(db)]),
+        ("sensor readings page", 1, lambda db: page(schemas.SensorReadingPage, crud.get_sensor_readings_page(db, limit=100))),
+    ]
+
+
+def seed(tag: str):
+    db = SessionLocal()
+    try:
+        for i in range(USERS):
+            user = crud.create_user(db, schemas.UserCreate(email=f"bench-{tag}-{i}@example.com", password="benchpass", full_name="bench"), FAKE_HASH)
+            for j in range(MESSAGES_PER_USER):
+                crud.create_user_message(db, schemas.UserMessageCreate(subject=f"bench {j}", message="bench"), user.id)
+    finally:
+        db.close()
+
+
+def cleanup(tag: str):
+    db = SessionLocal()
+    try:
+        users = models.User.email.like(f"bench-{tag}-%")
+        user_ids = [row.id for row in db.query(models.User.id).filter(users)]
+        if user_ids:
+            db.execute(delete(models.UserMessage).where(models.UserMessage.user_id.in_(user_ids)))
+        db.execute(delete(models.User).where(users))
+        db.commit()
+    finally:
+        db.close()
+
+
+def main() -> int:
+    tag = uuid.uuid4().hex[:8]
+    failures = 0
+    print("--- Statements per listing ---")
+    try:
+        seed(tag)
+        for name, budget, fn in checks():
+            db = SessionLocal()
+            try:
+                with statement_budget(budget, name) as counter:
+                    fn(db)
+                print(f"   OK    {name:<28} {counter.count}/{budget}")
+            except QueryBudgetExceeded as e:
+                failures += 1
+                print(f"   FAIL  {e}")
+            finally:
+                db.close()
+    finally:
+        cleanup(tag)
+    print("--- DONE ---" if not failures else f"--- {failures} OVER BUDGET ---")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
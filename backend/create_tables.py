@@ -1,8 +1,8 @@
 from dotenv import load_dotenv
 import os
 from sqlalchemy import create_engine, text
-from app.database import Base, engine
-from app import models
+from app.database import Base, SessionLocal, engine
+from app import crud, models
 
 # Load env variables explicitly
 load_dotenv()
@@ -35,6 +35,15 @@ def create_tables():
         print("3. Running create_all...")
         Base.metadata.create_all(bind=engine)
         print("   create_all executed.")
+
+        # 4. Default irrigation zones (same as the seed migration)
+        print("4. Seeding default irrigation zones...")
+        db = SessionLocal()
+        try:
+            inserted = crud.seed_default_zones(db)
+        finally:
+            db.close()
+        print(f"   {inserted} zones created." if inserted else "   Zones already present, nothing to do.")
         
         print("--- SUCCESS: Check your database now. ---")
 
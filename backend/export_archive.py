@@ -0,0 +1,32 @@
+import argparse
+from datetime import datetime
+from dotenv import load_dotenv
+from app.database import SessionLocal
+from app import archive
+
+# Load env variables explicitly
+load_dotenv()
+
+def export_archive(before: datetime, since: datetime = None, chunk_size: int = archive.ARCHIVE_CHUNK_SIZE):
+    print("--- Exporting old sensor readings to Parquet ---")
+    before, since = archive.day_bounds(before, since) # The archive holds whole days
+    print(f"   Range: [{since or 'beginning'} .. {before}), chunk size {chunk_size}")
+    print(f"   Target: {archive.ARCHIVE_DIR}")
+    db = SessionLocal()
+    try:
+        result = archive.export_readings(db, before=before, since=since, chunk_size=chunk_size)
+        print(f"   Exported {result['rows']} readings into {result['files']} files in {result['seconds']}s.")
+        print("--- SUCCESS ---")
+    except Exception as e:
+        print(f"--- FAILURE: An error occurred ---")
+        print(e)
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export sensor readings older than a date to Parquet")
+    parser.add_argument("--before", required=True, type=datetime.fromisoformat, help="Export readings before this date (YYYY-MM-DD)")
+    parser.add_argument("--since", type=datetime.fromisoformat, default=None, help="Only readings from this date on")
+    parser.add_argument("--chunk-size", type=int, default=archive.ARCHIVE_CHUNK_SIZE)
+    args = parser.parse_args()
+    export_archive(args.before, args.since, args.chunk_size)
@@ -0,0 +1,38 @@
+import sys
+from dotenv import load_dotenv
+from app.database import SessionLocal
+from app import partitions
+
+# Load env variables explicitly
+load_dotenv()
+
+def manage_partitions(dry_run: bool = False):
+    print("--- Sensor readings partition maintenance ---")
+    db = SessionLocal()
+    try:
+        if not partitions.is_partitioned(db):
+            print("   dev.sensor_readings is not partitioned. Run `alembic upgrade head` first.")
+            return
+
+        print(f"1. Interval: {partitions.SENSOR_PARTITION_INTERVAL}, ahead: {partitions.SENSOR_PARTITIONS_AHEAD}")
+        for name, start, end in partitions.list_partitions(db):
+            print(f"   {name}: [{start} .. {end})")
+
+        expired = partitions.expired_partitions(db)
+        if dry_run:
+            print(f"2. Dry run, would remove ({partitions.SENSOR_RETENTION_ACTION}): {[p[0] for p in expired]}")
+            return
+
+        print("2. Creating upcoming partitions...")
+        print(f"   Created: {partitions.ensure_partitions(db)}")
+        print(f"3. Applying retention ({partitions.SENSOR_RETENTION_DAYS} days, {partitions.SENSOR_RETENTION_ACTION})...")
+        print(f"   Removed: {partitions.apply_retention(db)}")
+        print("--- SUCCESS ---")
+    except Exception as e:
+        print(f"--- FAILURE: An error occurred ---")
+        print(e)
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    manage_partitions(dry_run="--dry-run" in sys.argv)
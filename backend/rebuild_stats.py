@@ -0,0 +1,27 @@
+from dotenv import load_dotenv
+from app.database import SessionLocal
+from app import crud
+
+# Load env variables explicitly
+load_dotenv()
+
+def rebuild_stats():
+    print("--- Rebuilding dashboard aggregates and rollups from dev.sensor_readings ---")
+    db = SessionLocal()
+    try:
+        sensors = crud.rebuild_sensor_summaries(db)
+        buckets = crud.rebuild_sensor_rollups(db)
+        stats = crud.get_dashboard_stats(db)
+        print(f"   Rebuilt summaries for {sensors} sensors.")
+        print(f"   Rebuilt {buckets} rollup buckets (1m/1h/1d).")
+        print(f"   Total readings: {stats['total_readings']}")
+        print("--- SUCCESS ---")
+    except Exception as e:
+        db.rollback()
+        print(f"--- FAILURE: An error occurred ---")
+        print(e)
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    rebuild_stats()
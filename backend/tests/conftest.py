@@ -0,0 +1,121 @@
+"""
+Fixtures for tests that drive the real routes against a development database.
+
+Run from backend/:
+    pip install -r requirements-dev.txt
+    python -m pytest
+
+The tests are skipped when DATABASE_URL is not reachable. Every row they create
+is prefixed 'bench-' and deleted at the end of the session.
+"""
+import os
+import uuid
+from datetime import timedelta
+
+import pytest
+
+# Read at import time by app modules: no broker, no partition DDL from the test process
+os.environ.setdefault("MQTT_ENABLED", "false")
+os.environ.setdefault("INGEST_BUFFER_ENABLED", "false")
+os.environ.setdefault("PARTITION_MAINTENANCE_ENABLED", "false")
+os.environ.setdefault("SECRET_KEY", "bench-test-secret")
+
+from fastapi.testclient import TestClient
+from sqlalchemy import delete, text, update
+
+from app import crud, models, schemas
+from app.database import SessionLocal, engine
+from app.main import app, create_access_token
+from app.query_budget import statement_budget
+
+FAKE_HASH = "bench-not-a-real-hash"
+MESSAGES = 20
+READINGS = 50
+
+
+class BudgetedApp:
+    """
+    ASGI wrapper that runs each HTTP request inside statement_budget().
+
+    TestClient serves the app from its own thread, so a counter opened in the test
+    would not see the request's statements; opened here, it covers the dependencies,
+    the endpoint and the response serialization (sync endpoints run in a copy of this
+    context). The next request's budget is set with `expect`; QueryBudgetExceeded
+    propagates out of the client call.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.limit = None
+        self.label = ""
+        self.counter = None
+
+    def expect(self, limit: int, label: str):
+        self.limit, self.label = limit, label
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self.limit is None:
+            await self.app(scope, receive, send)
+            return
+        limit, self.limit = self.limit, None
+        with statement_budget(limit, self.label) as counter:
+            self.counter = counter
+            await self.app(scope, receive, send)
+
+
+@pytest.fixture(scope="session")
+def database():
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+    except Exception as e:
+        pytest.skip(f"database not reachable: {e}")
+
+
+@pytest.fixture(scope="session")
+def seeded(database):
+    """An admin user with messages, and readings of one sensor; returns (admin email, sensor_id)."""
+    tag = uuid.uuid4().hex[:8]
+    email, sensor_id = f"bench-{tag}@example.com", f"bench-{tag}"
+    db = SessionLocal()
+    try:
+        user = crud.create_user(db, schemas.UserCreate(email=email, password="benchpass", full_name="bench"), FAKE_HASH)
+        db.execute(update(models.User).where(models.User.id == user.id).values(role="admin"))
+        db.commit()
+        for i in range(MESSAGES):
+            crud.create_user_message(db, schemas.UserMessageCreate(subject=f"bench {i}", message="bench"), user.id)
+        crud.create_sensor_readings_bulk(
+            db, [schemas.SensorReadingCreate(sensor_id=sensor_id, temperature=20.0, humidity=50.0) for _ in range(READINGS)]
+        )
+    finally:
+        db.close()
+    yield email, sensor_id
+    db = SessionLocal()
+    try:
+        db.execute(delete(models.SensorReading).where(models.SensorReading.sensor_id == sensor_id))
+        db.execute(delete(models.SensorSummary).where(models.SensorSummary.sensor_id == sensor_id))
+        db.execute(delete(models.SensorRollup).where(models.SensorRollup.sensor_id == sensor_id))
+        db.execute(delete(models.UserMessage).where(models.UserMessage.user_id == user.id))
+        db.execute(delete(models.User).where(models.User.id == user.id))
+        db.commit()
+    finally:
+        db.close()
+
+
+@pytest.fixture(scope="session")
+def budgeted():
+    return BudgetedApp(app)
+
+
+@pytest.fixture(scope="session")
+def client(budgeted):
+    # One client for the session: startup runs once and the async pool stays on one event loop
+    with TestClient(budgeted) as client:
+        yield client
+
+
+@pytest.fixture(scope="session")
+def admin_headers(seeded):
+    email, _ = seeded
+    token = create_access_token(data={"sub": email}, expires_delta=timedelta(minutes=15))
+    return {"Authorization": f"Bearer {token}"}
@@ -0,0 +1,63 @@
+"""
+SQL statements per request on the real routes, dependencies and response
+serialization included, so N+1 lazy loads and extra round trips in
+get_current_user are caught before they reach production.
+
+The principal cache is cleared before each request, so authenticated budgets
+count the cold get_current_user lookup (one SELECT); test_cached_principal
+checks the warm path separately.
+"""
+import pytest
+
+from app import auth_cache
+
+# (path, budget): one statement for the principal, one for the page
+AUTHENTICATED_BUDGETS = [
+    ("/admin/users?limit=50", 2),
+    ("/admin/messages?limit=50", 2),
+    ("/admin/messages?unread_only=true&limit=50", 2),
+    ("/admin/stats", 2), # At most: the counts snapshot may still be fresh
+    ("/irrigation/rules", 2),
+]
+
+PUBLIC_BUDGETS = [
+    ("/irrigation/zones", 1), # At most: the zone snapshot may still be fresh
+]
+
+
+def get_within(client, budgeted, path, budget, headers=None):
+    budgeted.expect(budget, f"GET {path}")
+    response = client.get(path, headers=headers)
+    assert response.status_code == 200, response.text
+    return response
+
+
+@pytest.mark.parametrize("path,budget", AUTHENTICATED_BUDGETS)
+def test_authenticated_endpoints(client, budgeted, admin_headers, path, budget):
+    auth_cache.principals.clear()
+    get_within(client, budgeted, path, budget, admin_headers)
+
+
+@pytest.mark.parametrize("path,budget", PUBLIC_BUDGETS)
+def test_public_endpoints(client, budgeted, path, budget):
+    get_within(client, budgeted, path, budget)
+
+
+def test_sensor_readings_page(client, budgeted, seeded, admin_headers):
+    _, sensor_id = seeded
+    auth_cache.principals.clear()
+    response = get_within(client, budgeted, f"/sensors/readings?sensor_id={sensor_id}&limit=20", 2, admin_headers)
+    page = response.json()
+    assert len(page["items"]) == 20 and page["next_cursor"]
+    # Next page with the principal cached: the page query only
+    get_within(client, budgeted, f"/sensors/readings?sensor_id={sensor_id}&limit=20&cursor={page['next_cursor']}", 1, admin_headers)
+
+
+def test_current_user(client, budgeted, admin_headers):
+    auth_cache.principals.clear()
+    get_within(client, budgeted, "/users/me", 1, admin_headers)
+
+
+def test_cached_principal(client, budgeted, admin_headers):
+    get_within(client, budgeted, "/users/me", 1, admin_headers)
+    get_within(client, budgeted, "/users/me", 0, admin_headers)
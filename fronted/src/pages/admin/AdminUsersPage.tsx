@@ -67,6 +67,8 @@ interface UserData {
 export function AdminUsersPage() {
     const { user } = useAuth();
     const [users, setUsers] = useState<UserData[]>([]);
+    const [nextCursor, setNextCursor] = useState<string | null>(null);
+    const [loadingMore, setLoadingMore] = useState(false);
     const [loading, setLoading] = useState(true);
     const [error, setError] = useState("");
 
@@ -92,11 +94,18 @@ export function AdminUsersPage() {
         password: ""
     });
 
+    // Role and status are filtered by the server, the search box over the loaded pages
+    const serverFilters = () => ({
+        role: filters.role === "all" ? undefined : filters.role,
+        is_active: filters.status === "all" ? undefined : filters.status === "active",
+    });
+
     const fetchUsers = async () => {
         setLoading(true);
         try {
-            const response = await adminService.getUsers();
-            setUsers(response);
+            const page = await adminService.getUsers(serverFilters());
+            setUsers(page.items);
+            setNextCursor(page.next_cursor);
         } catch (err) {
             console.error(err);
             setError("Error al cargar usuarios.");
@@ -105,6 +114,21 @@ export function AdminUsersPage() {
         }
     };
 
+    const loadMoreUsers = async () => {
+        if (!nextCursor) return;
+        setLoadingMore(true);
+        try {
+            const page = await adminService.getUsers({ ...serverFilters(), cursor: nextCursor });
+            setUsers(prev => [...prev, ...page.items]);
+            setNextCursor(page.next_cursor);
+        } catch (err) {
+            console.error(err);
+            toast.error("Error al cargar más usuarios");
+        } finally {
+            setLoadingMore(false);
+        }
+    };
+
     useEffect(() => {
         if (user?.role === "admin") {
             fetchUsers();
@@ -112,7 +136,7 @@ export function AdminUsersPage() {
             setLoading(false);
             setError("Acceso Denegado.");
         }
-    }, [user]);
+    }, [user, filters.role, filters.status]);
 
     // --- Filtering Logic ---
     const filteredUsers = useMemo(() => {
@@ -310,6 +334,14 @@ export function AdminUsersPage() {
                             )}
                         </TableBody>
                     </Table>
+                    {nextCursor && (
+                        <div className="flex justify-center pt-4">
+                            <Button variant="outline" onClick={loadMoreUsers} disabled={loadingMore}>
+                                {loadingMore && <Loader2 className="mr-2 h-4 w-4 animate-spin" />}
+                                Cargar más
+                            </Button>
+                        </div>
+                    )}
                 </CardContent>
             </Card>
 
@@ -18,6 +18,7 @@ export function IrrigationPanel() {
     const [loading, setLoading] = useState(true)
     const [editingZone, setEditingZone] = useState<IrrigationZone | null>(null)
     const [newName, setNewName] = useState("")
+    const [now, setNow] = useState(Date.now())
 
     const fetchZones = async () => {
         try {
@@ -32,11 +33,33 @@ export function IrrigationPanel() {
 
     useEffect(() => {
         fetchZones()
-        // Poll every 5 seconds for better responsiveness
-        const interval = setInterval(fetchZones, 5000)
-        return () => clearInterval(interval)
+        // Live zone changes pushed by the backend (SSE); resync if the stream drops us
+        const unsubscribe = irrigationService.subscribeZones(
+            (zone) => setZones(prev => prev.map(z => z.id === zone.id ? zone : z)),
+            fetchZones
+        )
+        // Slow safety poll in case the stream is unavailable
+        const interval = setInterval(fetchZones, 60000)
+        return () => {
+            unsubscribe()
+            clearInterval(interval)
+        }
     }, [])
 
+    // Local countdown from the server-side deadline (the backend switches the pump off itself)
+    const hasRunningTimer = zones.some(z => z.timer_ends_at)
+    useEffect(() => {
+        if (!hasRunningTimer) return
+        const tick = setInterval(() => setNow(Date.now()), 1000)
+        return () => clearInterval(tick)
+    }, [hasRunningTimer])
+
+    const secondsRemaining = (zone: IrrigationZone) => {
+        if (!zone.timer_ends_at) return zone.timer_seconds_remaining
+        // Backend datetimes are naive UTC
+        return Math.max(0, (Date.parse(zone.timer_ends_at + 'Z') - now) / 1000)
+    }
+
     const handleToggle = async (zone: IrrigationZone) => {
         try {
             // Optimistic update
@@ -165,9 +188,9 @@ export function IrrigationPanel() {
                                     <div className="mb-4 bg-white/50 p-2 rounded-lg">
                                         <div className="flex justify-between text-sm font-medium mb-1">
                                             <span className="text-blue-600">Tiempo Restante</span>
-                                            <span className="text-blue-800">{Math.ceil(zone.timer_seconds_remaining / 60)} min</span>
+                                            <span className="text-blue-800">{Math.ceil(secondsRemaining(zone) / 60)} min</span>
                                         </div>
-                                        <Progress value={Math.min(100, (zone.timer_seconds_remaining / (60 * 60)) * 100)} className="h-2" />
+                                        <Progress value={Math.min(100, (secondsRemaining(zone) / (60 * 60)) * 100)} className="h-2" />
                                     </div>
                                 )}
 
@@ -84,8 +84,9 @@ export interface IrrigationZone {
     id: number;
     name: string;
     is_pump_active: boolean;
-    mode: 'manual' | 'timer';
+    mode: 'manual' | 'timer' | 'auto';
     last_watered: string | null;
+    timer_ends_at: string | null; // UTC deadline of the running timer
     timer_seconds_remaining: number;
 }
 
@@ -110,6 +111,16 @@ export const irrigationService = {
             params: { seconds }
         });
         return response.data;
+    },
+
+    // Server-Sent Events: the backend pushes every zone change, no polling needed
+    subscribeZones(onZone: (zone: IrrigationZone) => void, onDropped?: () => void) {
+        // EventSource cannot send headers: the token goes in the query string
+        const token = localStorage.getItem('token') || '';
+        const source = new EventSource(`${API_URL}/events?topics=zones&access_token=${encodeURIComponent(token)}`);
+        source.addEventListener('zone', (event) => onZone(JSON.parse((event as MessageEvent).data)));
+        source.addEventListener('dropped', () => onDropped?.());
+        return () => source.close();
     }
 };
 
@@ -131,10 +142,15 @@ export interface UserMessage {
     user_email?: string;
 }
 
+export interface Page<T> {
+    items: T[];
+    next_cursor: string | null; // Pass back as `cursor` to get the next page
+}
+
 export const adminService = {
-    async getUsers() {
+    async getUsers(params: { role?: string; is_active?: boolean; cursor?: string; limit?: number } = {}) {
         // Updated path
-        const response = await api.get('/admin/users');
+        const response = await api.get<Page<any>>('/admin/users', { params });
         return response.data;
     },
     async updateUser(id: number, data: any) {
@@ -145,8 +161,8 @@ export const adminService = {
         const response = await api.get<AdminStats>('/admin/stats');
         return response.data;
     },
-    async getMessages() {
-        const response = await api.get<UserMessage[]>('/admin/messages');
+    async getMessages(params: { unread_only?: boolean; cursor?: string; limit?: number } = {}) {
+        const response = await api.get<Page<UserMessage>>('/admin/messages', { params });
         return response.data;
     },
     async deleteUser(id: number) {